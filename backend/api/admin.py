@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth import get_user_model
 
 from .models import (Cart, Favorite, Follow, Ingredient, IngredientRecipe,
-                     Recipe, Tag)
+                     Recipe, ShoppingListItem, Tag)
 
 admin.site.empty_value_display = 'Не указано'
 
@@ -21,11 +21,9 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = ('author', 'name')
     search_fields = ('author', 'name')
     list_filter = ('tags',)
-    readonly_fields = ('favorites_count',)
-
-    @admin.display(description='Добавлений в избранное')
-    def favorites_count(self, obj):
-        return obj.favorites.count()
+    readonly_fields = (
+        'favorites_count', 'carts_count', 'short_link_clicks'
+    )
 
 
 @admin.register(Tag)
@@ -35,16 +33,15 @@ class TagAdmin(admin.ModelAdmin):
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    list_display = ('username', 'email', 'followers', 'recipes_count')
+    list_display = ('username', 'email', 'followers_count', 'recipes_count')
     search_fields = ('username', 'email')
+    readonly_fields = ('recipes_count', 'followers_count', 'following_count')
 
-    @admin.display(description='Количество подписчиков')
-    def followers(self, obj):
-        return obj.followers.count()
 
-    @admin.display(description='Количество рецептов')
-    def recipes_count(self, obj):
-        return obj.recipes.count()
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ingredient', 'amount')
+    readonly_fields = ('user', 'ingredient', 'amount')
 
 
 @admin.register(Cart, Favorite, Follow, IngredientRecipe)
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import metrics, signals  # noqa: F401
+        from .search import search_index_post_migrate
+
+        post_migrate.connect(search_index_post_migrate, sender=self)
@@ -0,0 +1,65 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import get_version, token_version
+from .constants import AUTH_CACHE_SIZE, AUTH_CACHE_TTL
+
+
+class TTLCache:
+    """LRU-кэш в памяти процесса с ограниченным временем жизни записей."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            if len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Токен-аутентификация без запроса к базе для известных токенов.
+
+    Пользователь токена хранится в памяти процесса вместе с версией токена
+    из общего кэша; выход, смена пароля и сохранение пользователя через
+    save(), в том числе деактивация, меняют версию. Изменения в обход
+    сигналов, например QuerySet.update(is_active=False), версию не
+    меняют: такой пользователь остаётся аутентифицированным до истечения
+    AUTH_CACHE_TTL. Версии живут в кэше default, и с LocMemCache смена
+    версии видна только процессу, в котором она произошла."""
+
+    users = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+    def authenticate_credentials(self, key):
+        # Версия читается до запроса к базе: изменение, закоммиченное
+        # после чтения, сменит её и не оставит устаревшую запись
+        version = get_version(token_version(key))
+        entry = self.users.get(key)
+        if entry is None or entry[0] != version:
+            user, token = super().authenticate_credentials(key)
+            entry = (version, user, token)
+            self.users.set(key, entry)
+        # Представления меняют request.user и его файлы и связанные
+        # объекты: каждый запрос получает свою копию пользователя и токена
+        return copy.deepcopy(entry[1:])
@@ -0,0 +1,342 @@
+import json
+import math
+import random
+import re
+import time
+from collections import defaultdict
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .cache import (INGREDIENTS_VERSION, RECIPES_VERSION, TAGS_VERSION,
+                    bump_version)
+from .counters import rebuild_counters
+from .images import create_renditions
+from .models import (Cart, Favorite, Follow, Ingredient, IngredientRecipe,
+                     Recipe, Tag)
+from .search import update_search_documents
+from .shopping_list import apply_deltas
+from .signals import update_tags_masks
+
+User = get_user_model()
+
+ID_SEGMENT = re.compile(r'(?<=/)\d+(?=/)')
+BENCH_TAGS = ('bench-breakfast', 'bench-lunch', 'bench-dinner')
+BENCH_PASSWORD = 'bench-password'
+
+
+def seed_dataset(users, recipes, follows, favorites, carts,
+                 rng=random):
+    """Создаёт синтетических пользователей, рецепты и связи между ними
+    массовыми вставками; возвращает созданных пользователей."""
+    ingredient_ids = list(Ingredient.objects.values_list('pk', flat=True))
+    if not ingredient_ids:
+        raise ValueError('Сначала загрузите ингредиенты: load_ingredients')
+    tag_ids = list(Tag.objects.values_list('pk', flat=True))
+    if not tag_ids:
+        tag_ids = [
+            Tag.objects.create(name=slug, slug=slug).pk
+            for slug in BENCH_TAGS
+        ]
+
+    buffer = BytesIO()
+    Image.new('RGB', (640, 480), 'orange').save(buffer, 'PNG')
+    image = default_storage.save(
+        'recipes/images/benchmark.png', ContentFile(buffer.getvalue())
+    )
+    create_renditions(Recipe(image=image).image)
+
+    prefix = f'bench{time.time_ns()}'
+    password = make_password(BENCH_PASSWORD)
+    with transaction.atomic():
+        created_users = User.objects.bulk_create([
+            User(
+                email=f'{prefix}_{number}@example.com',
+                username=f'{prefix}_{number}',
+                first_name='Bench',
+                last_name=str(number),
+                password=password
+            ) for number in range(users)
+        ], batch_size=1000)
+        Token.objects.bulk_create(
+            [
+                Token(user=user, key=Token.generate_key())
+                for user in created_users
+            ],
+            batch_size=1000
+        )
+
+        created_recipes = Recipe.objects.bulk_create([
+            Recipe(
+                author=rng.choice(created_users),
+                name=f'Рецепт {number}',
+                text=f'Синтетический рецепт номер {number}',
+                image=image,
+                cooking_time=rng.randint(1, 120)
+            ) for number in range(recipes)
+        ], batch_size=1000)
+        IngredientRecipe.objects.bulk_create([
+            IngredientRecipe(
+                recipe=recipe, ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500)
+            ) for recipe in created_recipes
+            for ingredient_id in rng.sample(
+                ingredient_ids, min(5, len(ingredient_ids))
+            )
+        ], batch_size=1000)
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe=recipe, tag_id=tag_id)
+            for recipe in created_recipes
+            for tag_id in rng.sample(tag_ids, rng.randint(1, len(tag_ids)))
+        ], batch_size=1000)
+
+        relations = {Follow: [], Favorite: [], Cart: []}
+        for user in created_users:
+            others = [
+                other for other in rng.sample(
+                    created_users, min(follows + 1, len(created_users))
+                ) if other != user
+            ]
+            relations[Follow].extend(
+                Follow(user=user, following=other)
+                for other in others[:follows]
+            )
+            for model, count in ((Favorite, favorites), (Cart, carts)):
+                relations[model].extend(
+                    model(user=user, recipe=recipe)
+                    for recipe in rng.sample(
+                        created_recipes, min(count, len(created_recipes))
+                    )
+                )
+        for model, objects in relations.items():
+            model.objects.bulk_create(objects, batch_size=1000)
+
+        # Массовые вставки не вызывают сигналы: производные данные
+        # пересчитываются явно
+        recipe_ids = [recipe.pk for recipe in created_recipes]
+        update_tags_masks(recipe_ids)
+        update_search_documents(recipe_ids)
+        rebuild_counters(User, Recipe, Favorite, Cart, Follow)
+        apply_deltas({
+            (row['recipe__cart__user'], row['ingredient']): row['total']
+            for row in IngredientRecipe.objects.filter(
+                recipe__cart__user__in=created_users
+            ).values('recipe__cart__user', 'ingredient').annotate(
+                total=Sum('amount')
+            ).order_by()
+        })
+        bump_version(RECIPES_VERSION, TAGS_VERSION, INGREDIENTS_VERSION)
+    return created_users
+
+
+def generate_workload(count, users, rng=random):
+    """Типичная смесь запросов; user — номер пользователя или None."""
+    recipe_ids = list(Recipe.objects.values_list('pk', flat=True)[:1000])
+    author_ids = list(User.objects.values_list('pk', flat=True)[:1000])
+    tag_slugs = list(Tag.objects.values_list('slug', flat=True))
+    prefixes = list({
+        name[:3] for name in Ingredient.objects.values_list(
+            'name', flat=True
+        )[:200]
+    })
+    if not recipe_ids:
+        raise ValueError('Нет рецептов для нагрузки: используйте --seed')
+
+    def user():
+        return rng.randrange(users) if users else None
+
+    def any_user():
+        return rng.choice((None, user()))
+
+    mix = (
+        (30, lambda: ('GET', '/api/recipes/', any_user())),
+        (10, lambda: (
+            'GET', f'/api/recipes/?tags={rng.choice(tag_slugs)}',
+            any_user()
+        )),
+        (5, lambda: ('GET', '/api/recipes/?is_favorited=1', user())),
+        (5, lambda: ('GET', '/api/recipes/?search=рецепт', any_user())),
+        (5, lambda: (
+            'GET', f'/api/recipes/?author={rng.choice(author_ids)}',
+            any_user()
+        )),
+        (15, lambda: (
+            'GET', f'/api/recipes/{rng.choice(recipe_ids)}/', any_user()
+        )),
+        (5, lambda: (
+            'GET', f'/api/recipes/{rng.choice(recipe_ids)}/get-link/',
+            None
+        )),
+        (10, lambda: (
+            'GET', f'/api/ingredients/?name={rng.choice(prefixes)}', None
+        )),
+        (3, lambda: ('GET', '/api/tags/', None)),
+        (5, lambda: (
+            'GET', '/api/users/subscriptions/?recipes_limit=3', user()
+        )),
+        (2, lambda: ('GET', '/api/recipes/download_shopping_cart/', user())),
+        (2, lambda: ('GET', '/api/users/me/', user())),
+    )
+    weights = [weight for weight, _ in mix]
+    factories = [factory for _, factory in mix]
+
+    workload = []
+    while len(workload) < count:
+        if users and rng.random() < 0.03:
+            # Добавление и удаление из избранного парой, чтобы повторные
+            # прогоны работали с тем же состоянием данных
+            recipe_id, number = rng.choice(recipe_ids), user()
+            path = f'/api/recipes/{recipe_id}/favorite/'
+            workload.append({'method': 'POST', 'path': path, 'user': number})
+            workload.append(
+                {'method': 'DELETE', 'path': path, 'user': number}
+            )
+            continue
+        method, path, number = rng.choices(factories, weights)[0]()
+        if number is None and path.startswith((
+            '/api/users/', '/api/recipes/download', '/api/recipes/?is_'
+        )):
+            continue
+        workload.append({'method': method, 'path': path, 'user': number})
+    return workload[:count]
+
+
+def endpoint_name(method, path):
+    """Запрос, сгруппированный по шаблону адреса: /api/recipes/{id}/."""
+    return f"{method} {ID_SEGMENT.sub('{id}', path.split('?')[0])}"
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга; values отсортированы."""
+    if not values:
+        return None
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+class InProcessClient:
+    """Выполняет запросы тестовым клиентом в текущем процессе
+    и считает SQL-запросы каждого из них."""
+
+    mode = 'in-process'
+
+    def __init__(self, tokens):
+        hosts = [
+            host for host in settings.ALLOWED_HOSTS
+            if host not in ('*', '') and not host.startswith('.')
+        ]
+        self.host = hosts[0] if hosts else 'localhost'
+        # Без DEBUG запрос к localhost, которого нет в ALLOWED_HOSTS,
+        # получил бы 400 DisallowedHost вместо ответа API
+        self.allowed_hosts = [*settings.ALLOWED_HOSTS, self.host]
+        self.tokens = tokens
+
+    def request(self, method, path, token, body):
+        client = APIClient(HTTP_HOST=self.host)
+        if token:
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        with override_settings(
+            ALLOWED_HOSTS=self.allowed_hosts
+        ), CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.generic(
+                method, path,
+                json.dumps(body) if body is not None else '',
+                content_type='application/json'
+            )
+            content = (
+                b''.join(response.streaming_content) if response.streaming
+                else response.content
+            )
+            elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, len(queries), len(content)
+
+
+class HttpClient:
+    """Выполняет запросы к запущенному серверу по HTTP; число SQL-запросов
+    на стороне сервера не известно."""
+
+    mode = 'http'
+
+    def __init__(self, base_url, tokens):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.tokens = tokens
+
+    def request(self, method, path, token, body):
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        started = time.perf_counter()
+        response = self.session.request(
+            method, self.base_url + path, json=body, headers=headers
+        )
+        elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, None, len(response.content)
+
+
+def replay(client, workload):
+    """Проигрывает запросы и собирает отчёт по каждому адресу."""
+    results = defaultdict(lambda: {
+        'latencies': [], 'queries': [], 'errors': 0, 'bytes': 0
+    })
+    started = time.perf_counter()
+    for item in workload:
+        number = item.get('user')
+        token = (
+            client.tokens[number % len(client.tokens)]
+            if number is not None and client.tokens else None
+        )
+        status, elapsed, queries, size = client.request(
+            item['method'], item['path'], token, item.get('body')
+        )
+        result = results[endpoint_name(item['method'], item['path'])]
+        result['latencies'].append(elapsed)
+        result['bytes'] += size
+        if queries is not None:
+            result['queries'].append(queries)
+        if status >= 400:
+            result['errors'] += 1
+    total_elapsed = time.perf_counter() - started
+
+    def summary(latencies, queries, errors, size):
+        latencies = sorted(latencies)
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+            'queries_mean': (
+                round(sum(queries) / len(queries), 2) if queries else None
+            ),
+            'queries_max': max(queries) if queries else None,
+            'bytes_mean': size // len(latencies),
+        }
+
+    endpoints = {
+        name: summary(
+            result['latencies'], result['queries'], result['errors'],
+            result['bytes']
+        ) for name, result in sorted(results.items())
+    }
+    total = summary(
+        [value for result in results.values()
+         for value in result['latencies']],
+        [value for result in results.values() for value in result['queries']],
+        sum(result['errors'] for result in results.values()),
+        sum(result['bytes'] for result in results.values())
+    )
+    total['elapsed_s'] = round(total_elapsed, 3)
+    total['throughput_rps'] = round(len(workload) / total_elapsed, 2)
+    return {'mode': client.mode, 'total': total, 'endpoints': endpoints}
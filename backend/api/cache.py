@@ -0,0 +1,182 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from .constants import RESPONSE_CACHE_TIMEOUT
+
+VERSION_KEY = 'version:{}'
+RESPONSE_KEY = 'response:{}'
+
+RECIPES_VERSION = 'recipes'
+TAGS_VERSION = 'tags'
+INGREDIENTS_VERSION = 'ingredients'
+
+
+def recipe_version(pk):
+    return f'recipe:{pk}'
+
+
+def user_version(pk):
+    """Версия избранного, корзины и подписок пользователя."""
+    return f'user:{pk}'
+
+
+def token_version(key):
+    """Версия токена: меняется при выходе, смене пароля и деактивации."""
+    return f'token:{key}'
+
+
+def accepts_gzip(request):
+    return 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+
+def get_version(name):
+    """Версия набора данных: время последнего изменения в наносекундах."""
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_versions(names):
+    keys = [VERSION_KEY.format(name) for name in names]
+    versions = cache.get_many(keys)
+    return [
+        versions[key] if key in versions else get_version(name)
+        for key, name in zip(keys, names)
+    ]
+
+
+def bump_version(*names):
+    """Отмечает наборы данных изменившимися после фиксации транзакции."""
+    transaction.on_commit(lambda: cache.set_many(
+        {VERSION_KEY.format(name): time.time_ns() for name in names}, None
+    ))
+
+
+class DataVersionMixin:
+    """Версии наборов данных, от которых зависит ответ представления."""
+
+    cache_versions = ()
+
+    def get_cache_versions(self):
+        return list(self.cache_versions)
+
+    def get_current_versions(self):
+        if not hasattr(self, '_current_versions'):
+            self._current_versions = get_versions(self.get_cache_versions())
+        return self._current_versions
+
+
+class AnonymousCacheMixin(DataVersionMixin):
+    """Кэширует ответы list и retrieve на GET-запросы анонимов.
+
+    Версии наборов данных, от которых зависит ответ, входят в ключ кэша,
+    поэтому изменение данных делает старые записи недоступными."""
+
+    def get_response_cache_key(self, request):
+        if (
+            request.method != 'GET'
+            or request.user.is_authenticated
+            or request.accepted_renderer.format != 'json'
+        ):
+            return None
+        # Пустые значения значимы: пустой cursor включает курсорную
+        # пагинацию с другим форматом ответа
+        params = sorted(request.query_params.lists())
+        versions = self.get_current_versions()
+        digest = hashlib.sha256(
+            repr((request.get_host(), request.path, params, versions)).encode()
+        ).hexdigest()
+        return RESPONSE_KEY.format(digest)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                content, headers = cached
+                return HttpResponse(content, headers=headers)
+            request._response_cache_key = key
+        return handler(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        key = getattr(request, '_response_cache_key', None)
+        if key is not None and response.status_code == 200:
+            response.render()
+            cache.set(
+                key,
+                (response.content, dict(response.headers)),
+                RESPONSE_CACHE_TIMEOUT
+            )
+        return response
+
+
+class ConditionalGetMixin(DataVersionMixin):
+    """Отвечает 304 на If-None-Match в list и retrieve.
+
+    ETag вычисляется по версиям данных без обращения к базе;
+    user_dependent добавляет к ним версию данных пользователя. Формат
+    ответа и поддержка gzip клиентом тоже входят в ETag: представления
+    с разным Content-Encoding не получают одинаковый сильный ETag.
+    Last-Modified не отдаётся: HTTP-дата точна до секунды, и изменение
+    в ту же секунду давало бы клиентам с If-Modified-Since устаревший 304."""
+
+    user_dependent = False
+
+    def get_cache_versions(self):
+        versions = super().get_cache_versions()
+        user = self.request.user
+        if self.user_dependent and user.is_authenticated:
+            versions.append(user_version(user.pk))
+        return versions
+
+    def get_etag(self, request):
+        versions = self.get_current_versions()
+        params = sorted(request.query_params.lists())
+        user_pk = request.user.pk if self.user_dependent else None
+        digest = hashlib.sha256(repr((
+            request.path, params, user_pk, versions,
+            request.accepted_renderer.format, accepts_gzip(request)
+        )).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return handler(request, *args, **kwargs)
+        etag = self.get_etag(request)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
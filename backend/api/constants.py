@@ -3,5 +3,56 @@ MAX_LENGTH = 64
 # Максимальная количество символов, возвращаемых __str__()
 MAX_STR_LENGTH = 64
 
+# Максимальное количество тегов: по биту на тег в маске рецепта (bigint)
+MAX_TAGS = 63
+
 # Максимальное вермя приготовления
 MAX_COOKING_TIME = 600
+
+# Максимальное количество ингредиентов в ответе автодополнения
+INGREDIENT_SEARCH_LIMIT = 50
+
+# Время хранения PDF списка покупок в кэше, секунды
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60
+
+# Время хранения ответов для анонимных пользователей в кэше, секунды
+RESPONSE_CACHE_TIMEOUT = 15 * 60
+
+# Размеры производных изображений: название -> максимальные ширина и высота
+IMAGE_RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+# Качество сжатия производных изображений
+IMAGE_QUALITY = 82
+
+# Размер части строки base64, декодируемой за один шаг (кратен 4)
+BASE64_CHUNK_SIZE = 64 * 1024
+
+# Максимальное количество рецептов в одном пакетном запросе
+MAX_BATCH_RECIPES = 100
+# Попыток массовой вставки связей при конфликте с параллельным запросом
+BATCH_INSERT_ATTEMPTS = 3
+
+# Количество рецептов в LRU-кэше коротких ссылок
+SHORT_LINK_CACHE_SIZE = 10_000
+# Количество накопленных переходов по ссылкам, после которого они
+# записываются в базу
+SHORT_LINK_CLICKS_BATCH = 100
+# Максимальное время между записями переходов в базу, секунды
+SHORT_LINK_FLUSH_INTERVAL = 60
+
+# Границы корзин гистограммы времени обработки запроса, секунды
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# Границы корзин гистограммы числа SQL-запросов на один запрос
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Доля ответов с ошибкой, при которой замеры нагрузки недостоверны
+BENCHMARK_MAX_ERROR_RATE = 0.05
+
+# Количество пользователей в кэше токен-аутентификации процесса
+AUTH_CACHE_SIZE = 10_000
+# Время жизни записи кэша токен-аутентификации, секунды
+AUTH_CACHE_TTL = 5 * 60
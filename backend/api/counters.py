@@ -0,0 +1,50 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    """Подзапрос с количеством строк queryset, ссылающихся на pk по field."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def rebuild_counters(user_model, recipe_model, favorite_model, cart_model,
+                     follow_model):
+    """Пересчитывает денормализованные счётчики по связанным таблицам."""
+    recipe_model.objects.update(
+        favorites_count=count_subquery(favorite_model.objects, 'recipe'),
+        carts_count=count_subquery(cart_model.objects, 'recipe')
+    )
+    user_model.objects.update(
+        recipes_count=count_subquery(recipe_model.objects, 'author'),
+        followers_count=count_subquery(follow_model.objects, 'following'),
+        following_count=count_subquery(follow_model.objects, 'user')
+    )
+
+
+class DerivedFieldsMixin:
+    """Не перезаписывает derived_fields при обычном сохранении модели.
+
+    Счётчики и другие производные поля меняются сигналами и массовыми
+    UPDATE с F(); значения, загруженные в память до такого изменения,
+    не должны затирать его при save() без update_fields."""
+
+    derived_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.derived_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
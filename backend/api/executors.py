@@ -0,0 +1,43 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+
+
+@lru_cache(maxsize=None)
+def get_process_pool():
+    """Пул процессов для чистого Python, удерживающего GIL (reportlab).
+
+    Создаётся при первом обращении, то есть уже в процессе воркера.
+    Процессы запускаются через forkserver (или spawn), а не fork: fork
+    многопоточного воркера копирует захваченные другими потоками
+    блокировки и соединения с базой."""
+    start_method = (
+        'forkserver'
+        if 'forkserver' in multiprocessing.get_all_start_methods()
+        else 'spawn'
+    )
+    return ProcessPoolExecutor(
+        max_workers=settings.CPU_POOL_SIZE,
+        mp_context=multiprocessing.get_context(start_method)
+    )
+
+
+@lru_cache(maxsize=None)
+def get_thread_pool():
+    """Пул потоков для работы, отпускающей GIL (Pillow, base64, hashlib)."""
+    return ThreadPoolExecutor(
+        max_workers=settings.CPU_POOL_SIZE, thread_name_prefix='cpu'
+    )
+
+
+def run_in_pool(get_pool, func, *args):
+    """Выполняет func в ограниченном пуле и ждёт результат."""
+    return get_pool().submit(func, *args).result()
+
+
+async def arun_in_pool(get_pool, func, *args):
+    """Выполняет func в ограниченном пуле, не блокируя цикл событий."""
+    return await asyncio.wrap_future(get_pool().submit(func, *args))
@@ -0,0 +1,99 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .constants import IMAGE_QUALITY, IMAGE_RENDITIONS
+from .executors import get_thread_pool, run_in_pool
+
+RENDITION_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+RENDITIONS_DIR = 'renditions'
+
+
+def rendition_name(name, rendition, extension):
+    """Путь производного изображения рядом с исходным файлом."""
+    directory, filename = os.path.split(os.path.splitext(name)[0])
+    return os.path.join(
+        directory, RENDITIONS_DIR, f'{filename}_{rendition}.{extension}'
+    )
+
+
+def rendition_names(name):
+    return {
+        rendition: {
+            extension: rendition_name(name, rendition, extension)
+            for extension in RENDITION_FORMATS
+        } for rendition in IMAGE_RENDITIONS
+    }
+
+
+def has_renditions(field_file):
+    last_rendition = list(IMAGE_RENDITIONS)[-1]
+    last_extension = list(RENDITION_FORMATS)[-1]
+    return field_file.storage.exists(
+        rendition_name(field_file.name, last_rendition, last_extension)
+    )
+
+
+def create_renditions(field_file):
+    """Сохраняет уменьшенные копии изображения в WebP и JPEG."""
+    if not field_file or has_renditions(field_file):
+        return
+    run_in_pool(get_thread_pool, save_renditions, field_file)
+
+
+def has_transparency(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        'transparency' in image.info
+    )
+
+
+def flatten(image):
+    """Изображение без альфа-канала на белом фоне, для JPEG."""
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def save_renditions(field_file):
+    with field_file.open('rb'):
+        image = ImageOps.exif_transpose(Image.open(field_file))
+        image = image.convert(
+            'RGBA' if has_transparency(image) else 'RGB'
+        )
+
+    storage = field_file.storage
+    names = rendition_names(field_file.name)
+    for rendition, size in IMAGE_RENDITIONS.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        for extension, image_format in RENDITION_FORMATS.items():
+            buffer = BytesIO()
+            output = resized if image_format == 'WEBP' else flatten(resized)
+            output.save(buffer, image_format, quality=IMAGE_QUALITY)
+            name = names[rendition][extension]
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def delete_renditions(field_file):
+    if not field_file:
+        return
+    for names in rendition_names(field_file.name).values():
+        for name in names.values():
+            field_file.storage.delete(name)
+
+
+def rendition_urls(field_file):
+    if not field_file:
+        return None
+    return {
+        rendition: {
+            extension: field_file.storage.url(name)
+            for extension, name in names.items()
+        } for rendition, names in rendition_names(field_file.name).items()
+    }
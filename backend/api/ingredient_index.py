@@ -0,0 +1,44 @@
+import threading
+from bisect import bisect_left
+
+from .cache import INGREDIENTS_VERSION, get_version
+from .constants import INGREDIENT_SEARCH_LIMIT
+from .models import Ingredient
+
+
+class IngredientIndex:
+    """Отсортированный по названию список ингредиентов в памяти процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._keys = []
+        self._items = []
+
+    def _rebuild(self, version):
+        items = sorted(
+            Ingredient.objects.values('id', 'name', 'measurement_unit'),
+            key=lambda item: (item['name'].casefold(), item['id'])
+        )
+        self._keys, self._items = (
+            [item['name'].casefold() for item in items], items
+        )
+        self._version = version
+
+    def search(self, prefix, limit=INGREDIENT_SEARCH_LIMIT):
+        version = get_version(INGREDIENTS_VERSION)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._rebuild(version)
+
+        keys, items = self._keys, self._items
+        prefix = prefix.casefold()
+        start = end = bisect_left(keys, prefix)
+        stop = min(start + limit, len(keys))
+        while end < stop and keys[end].startswith(prefix):
+            end += 1
+        return items[start:end]
+
+
+ingredient_index = IngredientIndex()
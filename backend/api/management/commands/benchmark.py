@@ -0,0 +1,140 @@
+import json
+import random
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from api.benchmark import (HttpClient, InProcessClient, generate_workload,
+                           replay, seed_dataset)
+from api.constants import BENCHMARK_MAX_ERROR_RATE
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic dataset and replay a request mix against the API, '
+        'reporting latency percentiles, throughput and SQL queries'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', action='store_true',
+            help='Создать синтетические данные перед прогоном'
+        )
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--follows', type=int, default=5)
+        parser.add_argument('--favorites', type=int, default=10)
+        parser.add_argument('--carts', type=int, default=3)
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Количество запросов в сгенерированной нагрузке'
+        )
+        parser.add_argument(
+            '--workload',
+            help='JSONL с записанными запросами: method, path, user, body'
+        )
+        parser.add_argument(
+            '--save-workload',
+            help='Сохранить сгенерированную нагрузку в JSONL'
+        )
+        parser.add_argument(
+            '--url',
+            help='Адрес запущенного сервера; без него запросы выполняются '
+                 'в текущем процессе'
+        )
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='Файл отчёта в JSON'
+        )
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument(
+            '--max-error-rate', type=float, default=BENCHMARK_MAX_ERROR_RATE,
+            help='Доля ответов с ошибкой, при которой прогон завершается '
+                 'ошибкой'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['random_seed'])
+        try:
+            if options['seed']:
+                if options['users'] < 1:
+                    raise CommandError('Нужен хотя бы один пользователь')
+                users = seed_dataset(
+                    options['users'], options['recipes'],
+                    options['follows'], options['favorites'],
+                    options['carts'], rng=rng
+                )
+                self.stdout.write(
+                    f'Создано пользователей: {len(users)}, '
+                    f'рецептов: {options["recipes"]}'
+                )
+            else:
+                users = list(
+                    User.objects.filter(is_active=True).order_by('pk')[
+                        :options['users']
+                    ]
+                )
+            tokens = [
+                Token.objects.get_or_create(user=user)[0].key
+                for user in users
+            ]
+
+            if options['workload']:
+                with open(options['workload'], encoding='utf-8') as f:
+                    workload = [json.loads(line) for line in f if line.strip()]
+            else:
+                workload = generate_workload(
+                    options['requests'], len(tokens), rng=rng
+                )
+        except ValueError as error:
+            raise CommandError(error)
+
+        if options['save_workload']:
+            with open(options['save_workload'], 'w', encoding='utf-8') as f:
+                for item in workload:
+                    f.write(json.dumps(item, ensure_ascii=False) + '\n')
+
+        client = (
+            HttpClient(options['url'], tokens) if options['url']
+            else InProcessClient(tokens)
+        )
+        report = replay(client, workload)
+        report['started_at'] = datetime.now(timezone.utc).isoformat()
+        report['options'] = {
+            key: options[key] for key in (
+                'seed', 'users', 'recipes', 'follows', 'favorites', 'carts',
+                'requests', 'workload', 'url', 'random_seed'
+            )
+        }
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        total = report['total']
+        if total['errors'] > total['requests'] * options['max_error_rate']:
+            raise CommandError(
+                f'Ошибок: {total["errors"]} из {total["requests"]} '
+                'запросов, замеры недостоверны. Ошибки по адресам: '
+                f'{options["output"]}'
+            )
+
+        self.stdout.write(
+            f'{"endpoint":<48} {"n":>5} {"p50":>8} {"p95":>8} {"p99":>8} '
+            f'{"sql":>6}'
+        )
+        for name, stats in report['endpoints'].items():
+            queries = stats['queries_mean']
+            self.stdout.write(
+                f'{name:<48} {stats["requests"]:>5} {stats["p50_ms"]:>8} '
+                f'{stats["p95_ms"]:>8} {stats["p99_ms"]:>8} '
+                f'{"-" if queries is None else queries:>6}'
+            )
+        self.stdout.write(
+            f'Всего: {total["requests"]} запросов, ошибок: {total["errors"]}, '
+            f'{total["throughput_rps"]} запросов/с, '
+            f'p50/p95/p99: {total["p50_ms"]}/{total["p95_ms"]}/'
+            f'{total["p99_ms"]} мс. Отчёт: {options["output"]}'
+        )
@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from api.images import create_renditions
+from api.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Create missing image renditions for recipes and avatars'
+
+    def handle(self, *args, **options):
+        for recipe in Recipe.objects.only('image').iterator():
+            create_renditions(recipe.image)
+        for user in User.objects.exclude(avatar='').only('avatar').iterator():
+            create_renditions(user.avatar)
+        self.stdout.write('Производные изображения созданы!')
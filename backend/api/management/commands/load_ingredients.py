@@ -1,21 +1,203 @@
+import csv
 import json
+import os
+import re
+import time
+from io import StringIO
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from api.cache import INGREDIENTS_VERSION, bump_version
 from api.models import Ingredient
 
+READ_CHUNK_SIZE = 64 * 1024
+WHITESPACE = re.compile(r'\s*')
+
+
+def iter_json(file):
+    """Потоково читает JSON-массив объектов, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer, position = file.read(READ_CHUNK_SIZE), 0
+    position = WHITESPACE.match(buffer, position).end()
+    if not buffer.startswith('[', position):
+        raise CommandError('Ожидается JSON-массив')
+    position += 1
+    expect_item, empty = True, True
+    while True:
+        position = WHITESPACE.match(buffer, position).end()
+        if position == len(buffer):
+            chunk = file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('Неожиданный конец JSON-файла')
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        if not expect_item:
+            if buffer[position] == ']':
+                return
+            if buffer[position] != ',':
+                raise CommandError(
+                    'Ожидается запятая между объектами JSON-массива'
+                )
+            position += 1
+            expect_item = True
+            continue
+        if empty and buffer[position] == ']':
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('Некорректный JSON-файл')
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        expect_item, empty = False, False
+        try:
+            name, measurement_unit = item['name'], item['measurement_unit']
+        except (KeyError, TypeError):
+            raise CommandError(
+                'Ожидается объект с полями name и measurement_unit'
+            )
+        yield name, measurement_unit
+
+
+def iter_csv(file):
+    reader = csv.reader(file)
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < 2:
+            raise CommandError(
+                f'Строка {reader.line_num}: ожидаются название '
+                'и единица измерения'
+            )
+        yield row[0], row[1]
+
+
+def iter_batches(rows, batch_size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
 
 class Command(BaseCommand):
-    help = 'Load ingredients data'
+    help = 'Load ingredients data from JSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=os.path.join(
+                settings.BASE_DIR, 'data', 'ingredients.json'
+            ),
+            help='Путь к файлу ingredients.json или ingredients.csv'
+        )
+        parser.add_argument(
+            '--format',
+            choices=('json', 'csv'),
+            help='Формат файла, по умолчанию по расширению'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одной вставке'
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Не использовать COPY на PostgreSQL'
+        )
 
     def handle(self, *args, **options):
-        with open('data/ingredients.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            infredients = [
-                Ingredient(
-                    name=item['name'],
-                    measurement_unit=item['measurement_unit']
-                )for item in data
-            ]
-            Ingredient.objects.bulk_create(infredients)
-        self.stdout.write('Данные успешно загружены!')
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1][1:]
+        if file_format not in ('json', 'csv'):
+            raise CommandError('Укажите формат файла: json или csv')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть не меньше 1')
+        use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy']
+        )
+
+        started = time.monotonic()
+        count_before = Ingredient.objects.count()
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            rows = iter_json(f) if file_format == 'json' else iter_csv(f)
+            rows = (
+                (name.strip(), measurement_unit.strip())
+                for name, measurement_unit in rows
+            )
+            batches = iter_batches(rows, options['batch_size'])
+            with transaction.atomic():
+                if use_copy:
+                    processed = self.copy_batches(batches)
+                else:
+                    processed = self.insert_batches(batches)
+            bump_version(INGREDIENTS_VERSION)
+        elapsed = time.monotonic() - started
+        created = Ingredient.objects.count() - count_before
+
+        self.stdout.write(
+            f'Данные успешно загружены! Обработано строк: {processed}, '
+            f'добавлено: {created}, {processed / max(elapsed, 1e-6):.0f} '
+            'строк/с'
+        )
+
+    def insert_batches(self, batches):
+        processed = 0
+        for batch in batches:
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in batch
+                ],
+                ignore_conflicts=True
+            )
+            processed += len(batch)
+        return processed
+
+    def copy_batches(self, batches):
+        """COPY во временную таблицу и одна вставка с ON CONFLICT."""
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        copy_sql = (
+            'COPY ingredient_import (name, measurement_unit) '
+            'FROM STDIN WITH (FORMAT csv)'
+        )
+        # Только загружаемые столбцы: LIKE скопировал бы id NOT NULL без
+        # его IDENTITY, и COPY без id нарушил бы NOT NULL
+        columns = ', '.join(
+            '{} {}'.format(
+                field_name,
+                Ingredient._meta.get_field(field_name).db_type(connection)
+            ) for field_name in ('name', 'measurement_unit')
+        )
+        processed = 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE ingredient_import ({columns}) '
+                'ON COMMIT DROP'
+            )
+            for batch in batches:
+                buffer = StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                if hasattr(cursor.cursor, 'copy_expert'):
+                    cursor.cursor.copy_expert(copy_sql, buffer)
+                else:
+                    with cursor.cursor.copy(copy_sql) as copy:
+                        copy.write(buffer.getvalue())
+                processed += len(batch)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredient_import '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+        return processed
@@ -0,0 +1,17 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.counters import rebuild_counters
+from api.models import Cart, Favorite, Follow, Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild favorites, carts, recipes and followers counters'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_counters(User, Recipe, Favorite, Cart, Follow)
+        self.stdout.write('Счётчики пересчитаны!')
@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .constants import LATENCY_BUCKETS, QUERY_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+# Статистика SQL текущего запроса; контекст копируется в потоки
+# sync_to_async, поэтому запросы асинхронных представлений тоже учитываются
+current_queries = ContextVar('current_queries', default=None)
+
+
+class QueryStats:
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_queries.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_wrapper(sender, connection, **kwargs):
+    # Сигнал приходит при каждом переподключении того же DatabaseWrapper,
+    # а при CONN_MAX_AGE=0 это каждый запрос
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(
+            (*self.buckets, '+Inf'), self.counts
+        ):
+            total += count
+            yield bound, total
+
+
+class Metrics:
+    """Метрики запросов в памяти процесса по представлению и методу."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+        self.sql_duration = defaultdict(float)
+        self.response_bytes = defaultdict(int)
+        self.responses = defaultdict(int)
+
+    def observe(self, view, method, status, duration, queries, size):
+        key = (view, method)
+        with self._lock:
+            self.latency[key].observe(duration)
+            self.queries[key].observe(queries.count)
+            self.sql_duration[key] += queries.duration
+            self.response_bytes[key] += size
+            self.responses[key + (str(status),)] += 1
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        lines = []
+
+        def labels(**values):
+            return '{' + ','.join(
+                f'{name}="{value}"' for name, value in values.items()
+            ) + '}'
+
+        def histogram(name, description, histograms):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} histogram')
+            for (view, method), values in sorted(histograms.items()):
+                for bound, count in values.cumulative():
+                    lines.append(f'{name}_bucket' + labels(
+                        view=view, method=method, le=bound
+                    ) + f' {count}')
+                lines.append(
+                    f'{name}_sum' + labels(view=view, method=method)
+                    + f' {values.sum}'
+                )
+                lines.append(
+                    f'{name}_count' + labels(view=view, method=method)
+                    + f' {sum(values.counts)}'
+                )
+
+        def counter(name, description, values, label_names):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} counter')
+            for key, value in sorted(values.items()):
+                lines.append(
+                    name + labels(**dict(zip(label_names, key)))
+                    + f' {value}'
+                )
+
+        with self._lock:
+            counter(
+                'foodgram_requests_total', 'Обработанные запросы',
+                self.responses, ('view', 'method', 'status')
+            )
+            histogram(
+                'foodgram_request_duration_seconds',
+                'Время обработки запроса', self.latency
+            )
+            histogram(
+                'foodgram_request_sql_queries',
+                'SQL-запросов на один запрос', self.queries
+            )
+            counter(
+                'foodgram_sql_duration_seconds_total',
+                'Время выполнения SQL-запросов', self.sql_duration,
+                ('view', 'method')
+            )
+            counter(
+                'foodgram_response_bytes_total', 'Размер ответов',
+                self.response_bytes, ('view', 'method')
+            )
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    """Измеряет время, SQL-запросы и размер ответа каждого запроса
+    и пишет в журнал запросы медленнее SLOW_REQUEST_THRESHOLD."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        self.finish(request, response, queries, started)
+        return response
+
+    async def __acall__(self, request):
+        queries, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        self.finish(request, response, queries, started)
+        return response
+
+    def start(self):
+        queries = QueryStats()
+        return queries, current_queries.set(queries), time.perf_counter()
+
+    def finish(self, request, response, queries, started):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        size = 0 if response.streaming else len(response.content)
+        metrics.observe(
+            view, request.method, response.status_code, duration, queries,
+            size
+        )
+        if duration * 1000 >= settings.SLOW_REQUEST_THRESHOLD:
+            logger.warning(
+                'Медленный запрос %s %s (%s): %.1f мс, SQL-запросов %d '
+                'за %.1f мс', request.method, request.get_full_path(), view,
+                duration * 1000, queries.count, queries.duration * 1000
+            )
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.21 on 2026-10-17 04:28
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    return Coalesce(models.Subquery(
+        queryset.filter(**{field: models.OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=models.Count('pk')).values('count')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('api', 'Recipe')
+    Follow = apps.get_model('api', 'Follow')
+    Recipe.objects.update(
+        favorites_count=count_subquery(
+            apps.get_model('api', 'Favorite').objects, 'recipe'
+        ),
+        carts_count=count_subquery(
+            apps.get_model('api', 'Cart').objects, 'recipe'
+        )
+    )
+    apps.get_model('users', 'ProjectUser').objects.update(
+        recipes_count=count_subquery(Recipe.objects, 'author'),
+        followers_count=count_subquery(Follow.objects, 'following'),
+        following_count=count_subquery(Follow.objects, 'user')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_shoppinglistitem'),
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в корзину'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
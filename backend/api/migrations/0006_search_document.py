@@ -0,0 +1,110 @@
+# Generated by Django 4.2.21 on 2026-10-17 06:10
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+# SQL зафиксирован здесь: миграция не должна меняться вместе с api.search
+POSTGRESQL_SETUP = (
+    'ALTER TABLE api_recipe ADD COLUMN search_vector tsvector',
+    """UPDATE api_recipe SET search_vector =
+        to_tsvector('pg_catalog.russian', search_document)""",
+    """CREATE INDEX api_recipe_search_vector_gin
+        ON api_recipe USING GIN (search_vector)""",
+    """CREATE TRIGGER api_recipe_search_vector
+        BEFORE INSERT OR UPDATE OF search_document ON api_recipe
+        FOR EACH ROW EXECUTE FUNCTION tsvector_update_trigger(
+            search_vector, 'pg_catalog.russian', search_document
+        )""",
+)
+POSTGRESQL_TEARDOWN = (
+    'DROP TRIGGER IF EXISTS api_recipe_search_vector ON api_recipe',
+    'ALTER TABLE api_recipe DROP COLUMN IF EXISTS search_vector',
+)
+SQLITE_SETUP = (
+    """CREATE VIRTUAL TABLE api_recipe_fts USING fts5(
+        search_document, content='api_recipe', content_rowid='id',
+        tokenize='unicode61'
+    )""",
+    """INSERT INTO api_recipe_fts (rowid, search_document)
+        SELECT id, search_document FROM api_recipe""",
+    """CREATE TRIGGER api_recipe_fts_insert AFTER INSERT ON api_recipe
+    BEGIN
+        INSERT INTO api_recipe_fts (rowid, search_document)
+        VALUES (new.id, new.search_document);
+    END""",
+    """CREATE TRIGGER api_recipe_fts_delete AFTER DELETE ON api_recipe
+    BEGIN
+        INSERT INTO api_recipe_fts (api_recipe_fts, rowid, search_document)
+        VALUES ('delete', old.id, old.search_document);
+    END""",
+    """CREATE TRIGGER api_recipe_fts_update
+        AFTER UPDATE OF search_document ON api_recipe
+    BEGIN
+        INSERT INTO api_recipe_fts (api_recipe_fts, rowid, search_document)
+        VALUES ('delete', old.id, old.search_document);
+        INSERT INTO api_recipe_fts (rowid, search_document)
+        VALUES (new.id, new.search_document);
+    END""",
+)
+SQLITE_TEARDOWN = (
+    'DROP TRIGGER IF EXISTS api_recipe_fts_insert',
+    'DROP TRIGGER IF EXISTS api_recipe_fts_delete',
+    'DROP TRIGGER IF EXISTS api_recipe_fts_update',
+    'DROP TABLE IF EXISTS api_recipe_fts',
+)
+
+
+def fill_search_documents(apps, schema_editor):
+    Recipe = apps.get_model('api', 'Recipe')
+    IngredientRecipe = apps.get_model('api', 'IngredientRecipe')
+    ingredient_names = defaultdict(list)
+    for recipe_id, name in IngredientRecipe.objects.order_by(
+        'ingredient__name'
+    ).values_list('recipe_id', 'ingredient__name'):
+        ingredient_names[recipe_id].append(name)
+
+    recipes = list(Recipe.objects.only('id', 'name', 'text'))
+    for recipe in recipes:
+        recipe.search_document = '\n'.join((
+            recipe.name, recipe.text, ', '.join(ingredient_names[recipe.pk])
+        ))
+    Recipe.objects.bulk_update(
+        recipes, ('search_document',), batch_size=1000
+    )
+
+
+def run_vendor_sql(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def setup_search_index(apps, schema_editor):
+    run_vendor_sql(schema_editor, {
+        'postgresql': POSTGRESQL_SETUP,
+        'sqlite': SQLITE_SETUP,
+    })
+
+
+def teardown_search_index(apps, schema_editor):
+    run_vendor_sql(schema_editor, {
+        'postgresql': POSTGRESQL_TEARDOWN,
+        'sqlite': SQLITE_TEARDOWN,
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_tags_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_document',
+            field=models.TextField(default='', editable=False, verbose_name='Поисковый документ'),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(setup_search_index, teardown_search_index),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.21 on 2026-10-17 06:40
+
+from django.db import migrations, models
+
+SQLITE_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS api_recipe_fts_insert
+        AFTER INSERT ON api_recipe
+    BEGIN
+        INSERT INTO api_recipe_fts (rowid, search_document)
+        VALUES (new.id, new.search_document);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS api_recipe_fts_delete
+        AFTER DELETE ON api_recipe
+    BEGIN
+        INSERT INTO api_recipe_fts (api_recipe_fts, rowid, search_document)
+        VALUES ('delete', old.id, old.search_document);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS api_recipe_fts_update
+        AFTER UPDATE OF search_document ON api_recipe
+    BEGIN
+        INSERT INTO api_recipe_fts (api_recipe_fts, rowid, search_document)
+        VALUES ('delete', old.id, old.search_document);
+        INSERT INTO api_recipe_fts (rowid, search_document)
+        VALUES (new.id, new.search_document);
+    END""",
+)
+
+
+def restore_search_index(apps, schema_editor):
+    """Триггеры FTS5 из 0006 и перестроение индекса по api_recipe."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in SQLITE_TRIGGERS:
+        schema_editor.execute(statement)
+    schema_editor.execute(
+        "INSERT INTO api_recipe_fts (api_recipe_fts) VALUES ('rebuild')"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='short_link_clicks',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Переходов по короткой ссылке'),
+        ),
+        # На SQLite AddField пересоздаёт api_recipe и удаляет триггеры FTS5
+        migrations.RunPython(restore_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.21 on 2026-10-17 05:09
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicates(model):
+    """Удаляет повторные связи пользователя с рецептом, оставляя первую;
+    возвращает количество удалённых строк."""
+    first_ids = model.objects.values('user', 'recipe').annotate(
+        first_id=models.Min('id')
+    ).values('first_id')
+    deleted, _ = model.objects.exclude(id__in=first_ids).delete()
+    return deleted
+
+
+def count_subquery(queryset):
+    return Coalesce(models.Subquery(
+        queryset.filter(recipe=models.OuterRef('pk')).order_by().values(
+            'recipe'
+        ).annotate(count=models.Count('pk')).values('count')
+    ), 0)
+
+
+def deduplicate(apps, schema_editor):
+    Favorite = apps.get_model('api', 'Favorite')
+    Cart = apps.get_model('api', 'Cart')
+    favorites_removed = remove_duplicates(Favorite)
+    carts_removed = remove_duplicates(Cart)
+    if favorites_removed or carts_removed:
+        apps.get_model('api', 'Recipe').objects.update(
+            favorites_count=count_subquery(Favorite.objects),
+            carts_count=count_subquery(Cart.objects)
+        )
+    if carts_removed:
+        # Сигналы прибавляли ингредиенты каждой строки корзины к списку
+        # покупок, и повторные строки удвоили суммы: после удаления
+        # дублей список собирается заново, как в 0003
+        IngredientRecipe = apps.get_model('api', 'IngredientRecipe')
+        ShoppingListItem = apps.get_model('api', 'ShoppingListItem')
+        ShoppingListItem.objects.all().delete()
+        rows = IngredientRecipe.objects.filter(
+            recipe__cart__isnull=False
+        ).values('recipe__cart__user', 'ingredient').annotate(
+            total=models.Sum('amount')
+        ).order_by()
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(
+                user_id=row['recipe__cart__user'],
+                ingredient_id=row['ingredient'],
+                amount=row['total']
+            ) for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_recipe_short_link_clicks'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_cart'),
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favorite'),
+        ),
+    ]
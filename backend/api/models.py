@@ -1,8 +1,13 @@
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Exists, F, OuterRef, Prefetch, Value, Window
+from django.db.models.functions import RowNumber
 
-from .constants import MAX_COOKING_TIME, MAX_LENGTH, MAX_STR_LENGTH
+from .constants import (BATCH_INSERT_ATTEMPTS, MAX_COOKING_TIME, MAX_LENGTH,
+                        MAX_STR_LENGTH, MAX_TAGS)
+from .counters import DerivedFieldsMixin
 
 User = get_user_model()
 
@@ -47,6 +52,11 @@ class Tag(models.Model):
         unique=True,
         verbose_name='Уникальный идентификатор'
     )
+    bit = models.PositiveSmallIntegerField(
+        unique=True,
+        editable=False,
+        verbose_name='Бит в маске тегов рецепта'
+    )
 
     class Meta:
         verbose_name = 'тег'
@@ -55,8 +65,75 @@ class Tag(models.Model):
     def __str__(self):
         return self.name[:MAX_STR_LENGTH]
 
+    @property
+    def mask(self):
+        return 1 << self.bit
+
+    @classmethod
+    def free_bit(cls):
+        used = set(cls.objects.values_list('bit', flat=True))
+        return next((bit for bit in range(MAX_TAGS) if bit not in used), None)
+
+    def clean(self):
+        super().clean()
+        if self.bit is None and self.free_bit() is None:
+            raise ValidationError(f'Нельзя создать больше {MAX_TAGS} тегов')
+
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            self.bit = self.free_bit()
+            if self.bit is None:
+                raise ValidationError(
+                    f'Нельзя создать больше {MAX_TAGS} тегов'
+                )
+        super().save(*args, **kwargs)
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredientrecipe_set',
+                queryset=IngredientRecipe.objects.select_related('ingredient')
+            )
+        )
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False)
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(Cart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            ))
+        )
+
+    def for_read(self, user):
+        return self.with_related().with_user_flags(user)
+
+    def short(self):
+        """Только поля краткого представления рецепта."""
+        return self.only('id', 'author', 'name', 'image', 'cooking_time')
+
+    def latest_per_author(self, limit):
+        """Не больше limit последних рецептов каждого автора."""
+        return self.alias(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('author'),
+                order_by=(F('pub_date').desc(), F('id').desc())
+            )
+        ).filter(row_number__lte=limit)
 
-class Recipe(BaseModel):
+
+class Recipe(DerivedFieldsMixin, BaseModel):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -88,6 +165,38 @@ class Recipe(BaseModel):
         auto_now_add=True,
         db_index=True
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в избранное'
+    )
+    carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в корзину'
+    )
+    tags_mask = models.BigIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Маска тегов'
+    )
+    search_document = models.TextField(
+        default='',
+        editable=False,
+        verbose_name='Поисковый документ'
+    )
+    short_link_clicks = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Переходов по короткой ссылке'
+    )
+
+    derived_fields = (
+        'favorites_count', 'carts_count', 'short_link_clicks', 'tags_mask',
+        'search_document'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'рецепт'
@@ -96,6 +205,26 @@ class Recipe(BaseModel):
         default_related_name = 'recipes'
 
 
+class RawDeleteQuerySet(models.QuerySet):
+
+    def delete_pks(self, pks):
+        """Удаляет строки по pk одним DELETE, без сигналов post_delete
+        и каскадов Django: на таблицу не должны ссылаться другие."""
+        pks = list(pks)
+        if not pks:
+            return
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        placeholders = ', '.join(['%s'] * len(pks))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {quote_name(self.model._meta.db_table)} '
+                f'WHERE {quote_name(self.model._meta.pk.column)} '
+                f'IN ({placeholders})',
+                pks
+            )
+
+
 class IngredientRecipe(models.Model):
     ingredient = models.ForeignKey(
         Ingredient, on_delete=models.CASCADE, verbose_name='Ингредиент'
@@ -105,6 +234,17 @@ class IngredientRecipe(models.Model):
     )
     amount = models.IntegerField(verbose_name='Количество ингредиента')
 
+    objects = RawDeleteQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = instance.values_for_shopping_list()
+        return instance
+
+    def values_for_shopping_list(self):
+        return self.recipe_id, self.ingredient_id, self.amount
+
     def __str__(self):
         return f'{self.ingredient} {self.recipe} {self.amount}'
 
@@ -151,6 +291,41 @@ class Follow(models.Model):
         ]
 
 
+class SelectRecipeQuerySet(RawDeleteQuerySet):
+    """Массовые изменения связей пользователя с рецептами без сигналов.
+
+    Методы возвращают id рецептов, связи с которыми действительно
+    созданы или удалены: по ним вызывающий код обновляет счётчики
+    и списки покупок."""
+
+    def create_missing(self, user, recipe_ids):
+        for attempt in range(BATCH_INSERT_ATTEMPTS):
+            existing = set(self.filter(
+                user=user, recipe_id__in=recipe_ids
+            ).values_list('recipe_id', flat=True))
+            missing = [pk for pk in recipe_ids if pk not in existing]
+            try:
+                with transaction.atomic(using=self.db):
+                    self.bulk_create(
+                        [self.model(user=user, recipe_id=pk) for pk in missing]
+                    )
+            except IntegrityError:
+                # Часть связей успел создать параллельный запрос
+                if attempt == BATCH_INSERT_ATTEMPTS - 1:
+                    raise
+                continue
+            return missing
+
+    def delete_rows(self):
+        """Удаляет строки одним DELETE; строки блокируются заранее, так
+        что возвращаются ровно те, что удалил этот запрос."""
+        rows = dict(
+            self.select_for_update().values_list('pk', 'recipe_id')
+        )
+        self.delete_pks(rows)
+        return list(rows.values())
+
+
 class SelectRecipe(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, verbose_name='Пользователь'
@@ -159,6 +334,8 @@ class SelectRecipe(models.Model):
         Recipe, on_delete=models.CASCADE, verbose_name='Рецепт'
     )
 
+    objects = SelectRecipeQuerySet.as_manager()
+
     def __str__(self):
         return f'{self.user} {self.recipe}'
 
@@ -173,14 +350,38 @@ class SelectRecipe(models.Model):
 
 
 class Favorite(SelectRecipe):
-    class Meta:
+    class Meta(SelectRecipe.Meta):
         default_related_name = 'favorites'
         verbose_name = 'избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
 
 
 class Cart(SelectRecipe):
-    class Meta:
+    class Meta(SelectRecipe.Meta):
         default_related_name = 'cart'
         verbose_name = 'рецепт в корзине'
         verbose_name_plural = 'Рецепты в корзине'
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE, verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField(verbose_name='Количество ингредиента')
+
+    def __str__(self):
+        return f'{self.user} {self.ingredient} {self.amount}'
+
+    class Meta:
+        default_related_name = 'shopping_list'
+        verbose_name = 'позиция списка покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_ingredient'
+            ),
+        ]
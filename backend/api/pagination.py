@@ -1,5 +1,38 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+
+
+class SubscriptionCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    ordering = ('-id',)
+
+
+class CursorPaginationMixin:
+    """Включает курсорную пагинацию, если в запросе передан параметр cursor
+    (пустой — для первой страницы)."""
+
+    cursor_pagination_class = None
+
+    def get_cursor_pagination_class(self):
+        return self.cursor_pagination_class
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.get_cursor_pagination_class()
+            if (
+                pagination_class is None
+                or pagination_class.cursor_query_param
+                not in self.request.query_params
+            ):
+                return super().paginator
+            self._paginator = pagination_class()
+        return self._paginator
@@ -0,0 +1,62 @@
+import gzip
+import threading
+
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from .cache import accepts_gzip, get_version
+
+
+class ReferencePayload:
+    """Готовый JSON справочника и его gzip-версия в памяти процесса.
+
+    Пересобирается только при изменении версии набора данных."""
+
+    def __init__(self, version_name, serializer_class, queryset):
+        self.version_name = version_name
+        self.serializer_class = serializer_class
+        self.queryset = queryset
+        self._lock = threading.Lock()
+        self._version = None
+        self._buffers = None
+
+    def _build(self):
+        data = self.serializer_class(self.queryset.all(), many=True).data
+        content = JSONRenderer().render(data)
+        return content, gzip.compress(content)
+
+    def get_buffers(self):
+        version = get_version(self.version_name)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._buffers = self._build()
+                    self._version = version
+        return self._buffers
+
+    def response(self, request):
+        content, compressed = self.get_buffers()
+        gzipped = accepts_gzip(request)
+        response = HttpResponse(
+            compressed if gzipped else content,
+            content_type='application/json'
+        )
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
+
+
+class PreSerializedListMixin:
+    """Отдаёт list без параметров запроса из готового ReferencePayload."""
+
+    payload = None
+
+    def list(self, request, *args, **kwargs):
+        if (
+            any(request.query_params.values())
+            or request.accepted_renderer.format != 'json'
+        ):
+            return super().list(request, *args, **kwargs)
+        return self.payload.response(request)
@@ -0,0 +1,65 @@
+import hashlib
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from .constants import SHOPPING_LIST_CACHE_TIMEOUT
+from .executors import arun_in_pool, get_process_pool
+
+FONT_NAME = 'Arial'
+FONT_SIZE = 14
+LEFT_MARGIN = 100
+TOP_POSITION = 780
+BOTTOM_MARGIN = 50
+LINE_HEIGHT = 20
+CACHE_KEY = 'shopping_list_pdf:{}'
+
+
+@lru_cache(maxsize=None)
+def register_font():
+    """Регистрирует шрифт один раз за время жизни процесса."""
+    font_path = os.path.join(settings.BASE_DIR, 'fonts', 'arial.ttf')
+    pdfmetrics.registerFont(TTFont(FONT_NAME, font_path))
+
+
+def render_shopping_list(lines):
+    register_font()
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    p.setFont(FONT_NAME, FONT_SIZE)
+    p.drawString(LEFT_MARGIN, TOP_POSITION, 'Список покупок:')
+
+    y_position = TOP_POSITION - 2 * LINE_HEIGHT
+    for text in lines:
+        if y_position < BOTTOM_MARGIN:
+            p.showPage()
+            p.setFont(FONT_NAME, FONT_SIZE)
+            y_position = TOP_POSITION
+        p.drawString(LEFT_MARGIN, y_position, text)
+        y_position -= LINE_HEIGHT
+
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+async def get_shopping_list_pdf(lines):
+    """PDF списка покупок, закэшированный по содержимому списка.
+
+    Отрисовка выполняется в пуле процессов, не блокируя цикл событий."""
+    digest = hashlib.sha256('\n'.join(lines).encode()).hexdigest()
+    key = CACHE_KEY.format(digest)
+    content = await cache.aget(key)
+    if content is None:
+        content = await arun_in_pool(
+            get_process_pool, render_shopping_list, lines
+        )
+        await cache.aset(key, content, SHOPPING_LIST_CACHE_TIMEOUT)
+    return content
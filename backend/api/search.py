@@ -0,0 +1,142 @@
+import re
+from collections import defaultdict
+
+from django.db import connection, connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from .models import IngredientRecipe, Recipe
+
+# Таблица FTS5 с поисковыми документами рецептов для SQLite, созданная
+# миграцией 0006. Большинство изменений столбцов SQLite применяет
+# пересозданием таблицы api_recipe, и её триггеры при этом удаляются.
+# Поэтому после каждого migrate ensure_search_index восстанавливает
+# триггеры и перестраивает индекс, а миграции, пересоздающие api_recipe,
+# восстанавливают их сами, как 0007.
+SQLITE_FTS_TABLE = 'api_recipe_fts'
+SQLITE_TRIGGER_NAMES = (
+    'api_recipe_fts_insert', 'api_recipe_fts_delete', 'api_recipe_fts_update'
+)
+# Конфигурация полнотекстового поиска PostgreSQL
+POSTGRESQL_CONFIG = 'pg_catalog.russian'
+
+WORD = re.compile(r'\w+')
+
+SQLITE_TRIGGERS = (
+    f"""CREATE TRIGGER IF NOT EXISTS api_recipe_fts_insert
+        AFTER INSERT ON api_recipe
+    BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE} (rowid, search_document)
+        VALUES (new.id, new.search_document);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS api_recipe_fts_delete
+        AFTER DELETE ON api_recipe
+    BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}
+            ({SQLITE_FTS_TABLE}, rowid, search_document)
+        VALUES ('delete', old.id, old.search_document);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS api_recipe_fts_update
+        AFTER UPDATE OF search_document ON api_recipe
+    BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}
+            ({SQLITE_FTS_TABLE}, rowid, search_document)
+        VALUES ('delete', old.id, old.search_document);
+        INSERT INTO {SQLITE_FTS_TABLE} (rowid, search_document)
+        VALUES (new.id, new.search_document);
+    END""",
+)
+
+
+def ensure_search_index(connection):
+    """Восстанавливает удалённые пересозданием api_recipe триггеры FTS5
+    и перестраивает по api_recipe индекс, пропустивший изменения."""
+    if connection.vendor != 'sqlite':
+        return
+    names = (SQLITE_FTS_TABLE, *SQLITE_TRIGGER_NAMES)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT name FROM sqlite_master WHERE name IN ({})'.format(
+                ', '.join(['%s'] * len(names))
+            ),
+            names
+        )
+        existing = {name for name, in cursor.fetchall()}
+        if SQLITE_FTS_TABLE not in existing or existing.issuperset(names):
+            return
+        for statement in SQLITE_TRIGGERS:
+            cursor.execute(statement)
+        cursor.execute(
+            f"INSERT INTO {SQLITE_FTS_TABLE} ({SQLITE_FTS_TABLE}) "
+            "VALUES ('rebuild')"
+        )
+
+
+def search_index_post_migrate(sender, using, **kwargs):
+    ensure_search_index(connections[using])
+
+
+def update_search_documents(recipe_ids):
+    """Собирает поисковые документы рецептов: название, описание
+    и названия ингредиентов."""
+    ingredient_names = defaultdict(list)
+    for recipe_id, name in IngredientRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('ingredient__name').values_list(
+        'recipe_id', 'ingredient__name'
+    ):
+        ingredient_names[recipe_id].append(name)
+
+    recipes = list(
+        Recipe.objects.filter(pk__in=recipe_ids).only('id', 'name', 'text')
+    )
+    for recipe in recipes:
+        recipe.search_document = '\n'.join((
+            recipe.name, recipe.text, ', '.join(ingredient_names[recipe.pk])
+        ))
+    Recipe.objects.bulk_update(
+        recipes, ('search_document',), batch_size=1000
+    )
+
+
+def search_recipes(queryset, value):
+    """Рецепты, подходящие под поисковый запрос, с рангом search_rank."""
+    if connection.vendor == 'postgresql':
+        tsquery = f"websearch_to_tsquery('{POSTGRESQL_CONFIG}', %s)"
+        return queryset.alias(
+            search_match=RawSQL(
+                f'api_recipe.search_vector @@ {tsquery}',
+                (value,),
+                output_field=BooleanField()
+            ),
+            search_rank=RawSQL(
+                f'ts_rank(api_recipe.search_vector, {tsquery})',
+                (value,),
+                output_field=FloatField()
+            )
+        ).filter(search_match=True)
+
+    words = WORD.findall(value)
+    if not words:
+        return queryset.none()
+    if connection.vendor != 'sqlite':
+        for word in words:
+            queryset = queryset.filter(search_document__icontains=word)
+        return queryset.alias(
+            search_rank=RawSQL('0', (), output_field=FloatField())
+        )
+
+    match = ' '.join(f'"{word}"*' for word in words)
+    return queryset.alias(
+        search_rank=RawSQL(
+            f"""SELECT -bm25({SQLITE_FTS_TABLE}) FROM {SQLITE_FTS_TABLE}
+            WHERE {SQLITE_FTS_TABLE} MATCH %s
+            AND {SQLITE_FTS_TABLE}.rowid = api_recipe.id""",
+            (match,),
+            output_field=FloatField()
+        )
+    ).filter(pk__in=RawSQL(
+        f"""SELECT rowid FROM {SQLITE_FTS_TABLE}
+        WHERE {SQLITE_FTS_TABLE} MATCH %s""",
+        (match,)
+    ))
@@ -1,46 +1,148 @@
 import base64
+import hashlib
+from tempfile import SpooledTemporaryFile
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.core.files import File
+from django.db import transaction
 from djoser.serializers import UserCreateSerializer
 from rest_framework import serializers
 
-from .constants import MAX_COOKING_TIME
+from .constants import BASE64_CHUNK_SIZE, MAX_BATCH_RECIPES, MAX_COOKING_TIME
+from .executors import get_thread_pool, run_in_pool
+from .images import rendition_urls
 from .models import (Cart, Favorite, Follow, Ingredient, IngredientRecipe,
                      Recipe, Tag)
+from .search import update_search_documents
+from .shopping_list import change_recipe_ingredients
 
 User = get_user_model()
 
 
+def decode_base64(encoded, max_size):
+    """Декодирует base64 частями во временный файл; возвращает файл
+    и sha256 содержимого. Переводы строк и пробелы пропускаются,
+    как и в base64.b64decode без validate; размер проверяется
+    по мере декодирования."""
+    file = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    digest = hashlib.sha256()
+    size = 0
+    rest = ''
+    try:
+        for start in range(0, len(encoded), BASE64_CHUNK_SIZE):
+            part = rest + ''.join(
+                encoded[start:start + BASE64_CHUNK_SIZE].split()
+            )
+            # Остаток меньше четырёх символов декодируется со следующей
+            # частью: группа base64 могла разорваться пробелом
+            end = len(part) - len(part) % 4
+            rest = part[end:]
+            chunk = base64.b64decode(part[:end], validate=True)
+            size += len(chunk)
+            if size > max_size:
+                raise serializers.ValidationError(
+                    f'Размер изображения больше {max_size} байт'
+                )
+            digest.update(chunk)
+            file.write(chunk)
+        if rest:
+            raise ValueError('Неполная группа base64')
+    except (ValueError, serializers.ValidationError):
+        file.close()
+        raise
+    file.seek(0)
+    return file, digest.hexdigest()
+
+
 class Base64ImageField(serializers.ImageField):
-    def to_internal_value(self, data):
+    """Изображение в base64, сохраняемое под именем из хэша содержимого.
 
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
-        return super().to_internal_value(data)
+    Строка декодируется частями во временный файл, размер ограничен
+    настройкой MAX_IMAGE_SIZE; уже загруженный файл переиспользуется."""
+
+    def decode(self, data):
+        header, _, encoded = data.partition(';base64,')
+        ext = header.split('/')[-1]
+        if not ext.isalnum() or not encoded:
+            raise serializers.ValidationError('Некорректное изображение')
+
+        try:
+            file, digest = run_in_pool(
+                get_thread_pool, decode_base64, encoded,
+                settings.MAX_IMAGE_SIZE
+            )
+        except ValueError:
+            raise serializers.ValidationError('Некорректное изображение')
+        return File(file, name=f'{digest}.{ext.lower()}')
+
+    def to_internal_value(self, data):
+        if not (isinstance(data, str) and data.startswith('data:image')):
+            return super().to_internal_value(data)
+
+        file = super().to_internal_value(self.decode(data))
+        model_field = self.parent.Meta.model._meta.get_field(self.source)
+        name = model_field.generate_filename(None, file.name)
+        if model_field.storage.exists(name):
+            file.close()
+            return name
+        return file
+
+
+def get_following_ids(request):
+    """Id авторов, на которых подписан пользователь, один запрос на запрос."""
+    following_ids = getattr(request, '_following_ids', None)
+    if following_ids is None:
+        following_ids = set()
+        if request.user.is_authenticated:
+            following_ids = set(Follow.objects.filter(
+                user=request.user
+            ).values_list('following_id', flat=True))
+        request._following_ids = following_ids
+    return following_ids
+
+
+def get_recipes_limit(request):
+    """Значение параметра recipes_limit или None, если он не задан."""
+    try:
+        recipes_limit = int(request.query_params.get('recipes_limit'))
+    except (ValueError, TypeError):
+        return None
+    return recipes_limit if recipes_limit >= 0 else None
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения в WebP и JPEG."""
+
+    def to_representation(self, value):
+        urls = rendition_urls(value)
+        request = self.context.get('request')
+        if urls is None or request is None:
+            return urls
+        return {
+            rendition: {
+                extension: request.build_absolute_uri(url)
+                for extension, url in formats.items()
+            } for rendition, formats in urls.items()
+        }
 
 
 class UserSerializer(serializers.ModelSerializer):
     avatar = Base64ImageField(required=False, allow_null=True, read_only=True)
+    avatar_renditions = ImageRenditionsField(source='avatar')
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = (
             'id', 'email', 'username', 'first_name', 'last_name', 'avatar',
-            'is_subscribed'
+            'avatar_renditions', 'is_subscribed'
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        if not user.is_authenticated:
-            return False
-        following = Follow.objects.filter(
-            user=user, following=obj.pk
-        )
-        return following.exists()
+        return obj.pk in get_following_ids(self.context['request'])
 
 
 class ProjectUserCreateSerializer(UserCreateSerializer):
@@ -73,12 +175,12 @@ class TagSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Tag
-        fields = '__all__'
+        fields = ('id', 'name', 'slug')
         read_only_fields = ('name', 'slug')
 
 
 class InputIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(min_value=1)
 
     class Meta:
@@ -92,9 +194,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     ingredients = InputIngredientSerializer(
         many=True, write_only=True, allow_empty=False
     )
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all(), write_only=True,
-        allow_empty=False
+    tags = serializers.ListField(
+        child=serializers.IntegerField(), write_only=True, allow_empty=False
     )
     cooking_time = serializers.IntegerField(
         min_value=1, max_value=MAX_COOKING_TIME
@@ -102,9 +203,23 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        exclude = ('pub_date',)
+        exclude = (
+            'pub_date', 'favorites_count', 'carts_count', 'tags_mask',
+            'search_document', 'short_link_clicks'
+        )
         read_only_fields = ('author',)
 
+    def get_objects(self, model, ids, field_name, errors):
+        """Находит объекты по id одним запросом; несуществующие id
+        добавляет в errors."""
+        objects = model.objects.in_bulk(ids)
+        missing = [str(pk) for pk in ids if pk not in objects]
+        if missing:
+            errors[field_name] = [
+                f'Объекты не существуют: {", ".join(missing)}'
+            ]
+        return objects
+
     def validate(self, attrs):
         attrs = super().validate(attrs)
         tags = attrs.get('tags', [])
@@ -133,20 +248,42 @@ class RecipeSerializer(serializers.ModelSerializer):
                     'Количество ингредиента не может быть отрицательным'
                 )
 
+        errors = {}
+        tag_objects = self.get_objects(Tag, tags, 'tags', errors)
+        ingredient_objects = self.get_objects(
+            Ingredient, ids, 'ingredients', errors
+        )
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        attrs['tags'] = [tag_objects[pk] for pk in tags]
+        for ingr in ingredients:
+            ingr['id'] = ingredient_objects[ingr['id']]
+
         return attrs
 
     def to_representation(self, instance):
+        instance = Recipe.objects.for_read(
+            self.context['request'].user
+        ).get(pk=instance.pk)
         return RecipeReadSerializer(instance, context=self.context).data
 
     def create_ingredient_recipe(self, recipe, ingredients_data):
-        return IngredientRecipe.objects.bulk_create([
+        ingredient_recipes = IngredientRecipe.objects.bulk_create([
             IngredientRecipe(
                 ingredient=ingredient_data['id'],
                 recipe=recipe,
                 amount=ingredient_data['amount']
             ) for ingredient_data in ingredients_data
         ])
-
+        change_recipe_ingredients(recipe.pk, {
+            ingredient_recipe.ingredient_id: ingredient_recipe.amount
+            for ingredient_recipe in ingredient_recipes
+        })
+        update_search_documents([recipe.pk])
+        return ingredient_recipes
+
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context['request'].user
         ingredients = validated_data.pop('ingredients')
@@ -158,15 +295,53 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         return recipe
 
+    def update_ingredient_recipe(self, recipe, ingredients_data):
+        """Применяет только изменившиеся строки ингредиентов рецепта.
+
+        Списки покупок получают одно суммарное изменение по всем
+        строкам; документ поиска и версии кэша обновляет сохранение
+        рецепта в update."""
+        current = {
+            ingredient_recipe.ingredient_id: ingredient_recipe
+            for ingredient_recipe in recipe.ingredientrecipe_set.all()
+        }
+        submitted = {
+            ingredient_data['id'].pk: ingredient_data
+            for ingredient_data in ingredients_data
+        }
+        changes, changed, removed = {}, [], []
+        for ingredient_id, ingredient_recipe in current.items():
+            ingredient_data = submitted.get(ingredient_id)
+            if ingredient_data is None:
+                changes[ingredient_id] = -ingredient_recipe.amount
+                removed.append(ingredient_recipe.pk)
+            elif ingredient_data['amount'] != ingredient_recipe.amount:
+                changes[ingredient_id] = (
+                    ingredient_data['amount'] - ingredient_recipe.amount
+                )
+                ingredient_recipe.amount = ingredient_data['amount']
+                changed.append(ingredient_recipe)
+        IngredientRecipe.objects.bulk_update(changed, ('amount',))
+        IngredientRecipe.objects.delete_pks(removed)
+
+        created = IngredientRecipe.objects.bulk_create([
+            IngredientRecipe(
+                ingredient=ingredient_data['id'],
+                recipe=recipe,
+                amount=ingredient_data['amount']
+            ) for ingredient_id, ingredient_data in submitted.items()
+            if ingredient_id not in current
+        ])
+        for ingredient_recipe in created:
+            changes[ingredient_recipe.ingredient_id] = ingredient_recipe.amount
+        change_recipe_ingredients(recipe.pk, changes)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags_data = validated_data.pop('tags')
-        instance.tags.set(tags_data)
-        ingredients_data = validated_data.pop('ingredients')
-        instance.ingredientrecipe_set.all().delete()
-        self.create_ingredient_recipe(
-            instance, ingredients_data
+        instance.tags.set(validated_data.pop('tags'))
+        self.update_ingredient_recipe(
+            instance, validated_data.pop('ingredients')
         )
-        instance.save()
         return super().update(instance, validated_data)
 
 
@@ -185,38 +360,31 @@ class IngredientRecipeSerializer(serializers.ModelSerializer):
 
 class RecipeReadSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
+    image_renditions = ImageRenditionsField(source='image')
     author = UserSerializer()
     ingredients = IngredientRecipeSerializer(
         many=True,
         source='ingredientrecipe_set'
     )
     tags = TagSerializer(many=True)
-    is_favorited = serializers.SerializerMethodField()
-    is_in_shopping_cart = serializers.SerializerMethodField()
+    is_favorited = serializers.BooleanField(read_only=True)
+    is_in_shopping_cart = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = Recipe
-        exclude = ('pub_date',)
+        exclude = (
+            'pub_date', 'favorites_count', 'carts_count', 'tags_mask',
+            'search_document', 'short_link_clicks'
+        )
         read_only_fields = ('image', 'author', 'tags')
 
-    def get_is_favorited(self, obj):
-        user = self.context['request'].user
-        if not user.is_authenticated:
-            return False
-        return obj.favorites.filter(user=user).exists()
-
-    def get_is_in_shopping_cart(self, obj):
-        user = self.context['request'].user
-        if not user.is_authenticated:
-            return False
-        return obj.cart.filter(user=user).exists()
-
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField(source='image')
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image', 'name', 'cooking_time')
+        fields = ('id', 'image', 'image_renditions', 'name', 'cooking_time')
         read_only_fields = ('id', 'image', 'name', 'cooking_time')
 
 
@@ -228,22 +396,17 @@ class FollowSerializer(UserSerializer):
         model = User
         fields = (
             'id', 'email', 'username', 'first_name', 'last_name', 'avatar',
-            'is_subscribed', 'recipes', 'recipes_count'
+            'avatar_renditions', 'is_subscribed', 'recipes', 'recipes_count'
         )
         read_only_fields = fields
 
     def get_recipes(self, obj):
-        recipes = obj.recipes.all()
-        recipes_limit = self.context['request'].query_params.get(
-            'recipes_limit')
-
-        try:
-            recipes_limit = int(recipes_limit)
-        except (ValueError, TypeError):
-            recipes_limit = None
-
-        if recipes_limit is not None and recipes_limit >= 0:
-            recipes = recipes[:recipes_limit]
+        recipes = getattr(obj, 'latest_recipes', None)
+        if recipes is None:
+            recipes = obj.recipes.short()
+            recipes_limit = get_recipes_limit(self.context['request'])
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return ShortRecipeSerializer(recipes, many=True).data
 
 
@@ -305,6 +468,17 @@ class RelationMixin:
         ).data
 
 
+class RecipeBatchSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BATCH_RECIPES
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
 class CartSerializer(RelationMixin, serializers.ModelSerializer):
     relation_model = Cart
     message = 'корзине'
@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Cart, IngredientRecipe, ShoppingListItem
+
+
+def apply_deltas(deltas):
+    """Изменяет списки покупок на {(user_id, ingredient_id): количество}."""
+    deltas = {key: amount for key, amount in deltas.items() if amount}
+    if not deltas:
+        return
+
+    user_ids = {user_id for user_id, _ in deltas}
+    ingredient_ids = {ingredient_id for _, ingredient_id in deltas}
+    with transaction.atomic():
+        items = ShoppingListItem.objects.select_for_update().filter(
+            user_id__in=user_ids, ingredient_id__in=ingredient_ids
+        )
+        changed, emptied = [], []
+        for item in items:
+            delta = deltas.pop((item.user_id, item.ingredient_id), None)
+            if delta is None:
+                continue
+            item.amount += delta
+            if item.amount > 0:
+                changed.append(item)
+            else:
+                emptied.append(item.pk)
+
+        ShoppingListItem.objects.bulk_update(changed, ('amount',))
+        ShoppingListItem.objects.filter(pk__in=emptied).delete()
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=amount
+            ) for (user_id, ingredient_id), amount in deltas.items()
+            if amount > 0
+        ])
+
+
+def change_cart(user_id, recipe_ids, sign):
+    """Добавляет (sign=1) или убирает (sign=-1) рецепты из списка покупок."""
+    deltas = defaultdict(int)
+    for ingredient_id, amount in IngredientRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('ingredient_id', 'amount'):
+        deltas[user_id, ingredient_id] += sign * amount
+    apply_deltas(deltas)
+
+
+def change_recipe_ingredients(recipe_id, changes):
+    """Переносит {ingredient_id: изменение} в списки покупок рецепта."""
+    changes = {key: amount for key, amount in changes.items() if amount}
+    if not changes:
+        return
+
+    deltas = defaultdict(int)
+    for user_id in Cart.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('user_id', flat=True):
+        for ingredient_id, amount in changes.items():
+            deltas[user_id, ingredient_id] += amount
+    apply_deltas(deltas)
+
+
+def replace_ingredient_recipe(old_values, new_values):
+    """Заменяет строку ингредиента рецепта (recipe_id, ingredient_id,
+    amount) в списках покупок; None — строки нет."""
+    changes = defaultdict(lambda: defaultdict(int))
+    for values, sign in ((old_values, -1), (new_values, 1)):
+        if values is not None:
+            recipe_id, ingredient_id, amount = values
+            changes[recipe_id][ingredient_id] += sign * amount
+    for recipe_id, recipe_changes in changes.items():
+        change_recipe_ingredients(recipe_id, recipe_changes)
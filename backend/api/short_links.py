@@ -0,0 +1,122 @@
+import atexit
+import string
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.db.models import Case, F, Value, When
+
+from .constants import (SHORT_LINK_CACHE_SIZE, SHORT_LINK_CLICKS_BATCH,
+                        SHORT_LINK_FLUSH_INTERVAL)
+from .models import Recipe
+
+ALPHABET = string.digits + string.ascii_letters
+BASE = len(ALPHABET)
+# Наибольший pk рецепта: BigAutoField хранит знаковое 64-битное целое
+MAX_PK = 2 ** 63 - 1
+
+
+def encode(pk):
+    """Короткий код рецепта: pk в системе счисления по основанию 62."""
+    code = ''
+    while True:
+        pk, digit = divmod(pk, BASE)
+        code = ALPHABET[digit] + code
+        if not pk:
+            return code
+
+
+def decode(code):
+    """pk рецепта по короткому коду; ValueError для некорректного кода
+    и для кода больше MAX_PK."""
+    if (
+        not code
+        or len(code) > MAX_CODE_LENGTH
+        or code[0] == '0' and len(code) > 1
+    ):
+        raise ValueError(code)
+    pk = 0
+    for char in code:
+        digit = ALPHABET.find(char)
+        if digit < 0:
+            raise ValueError(code)
+        pk = pk * BASE + digit
+    if pk > MAX_PK:
+        raise ValueError(code)
+    return pk
+
+
+MAX_CODE_LENGTH = len(encode(MAX_PK))
+
+
+class ShortLinkResolver:
+    """Проверяет существование рецептов через LRU-кэш в памяти процесса
+    и копит переходы по ссылкам, записывая их в базу пачками.
+
+    Накопленное записывается и при штатном завершении процесса; при
+    аварийном (SIGKILL, OOM) теряются переходы последней пачки."""
+
+    def __init__(self, size=SHORT_LINK_CACHE_SIZE,
+                 batch=SHORT_LINK_CLICKS_BATCH,
+                 interval=SHORT_LINK_FLUSH_INTERVAL):
+        self.size = size
+        self.batch = batch
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._known = OrderedDict()
+        self._clicks = Counter()
+        self._flushed_at = time.monotonic()
+
+    def exists(self, pk):
+        with self._lock:
+            if pk in self._known:
+                self._known.move_to_end(pk)
+                return True
+        # Отсутствующие рецепты не кэшируются: они могут появиться позже
+        if not Recipe.objects.filter(pk=pk).exists():
+            return False
+        with self._lock:
+            self._known[pk] = True
+            if len(self._known) > self.size:
+                self._known.popitem(last=False)
+        return True
+
+    def forget(self, pk):
+        with self._lock:
+            self._known.pop(pk, None)
+
+    def resolve(self, code):
+        """pk рецепта по коду или None; учитывает переход по ссылке."""
+        try:
+            pk = decode(code)
+        except ValueError:
+            return None
+        if not self.exists(pk):
+            return None
+        with self._lock:
+            self._clicks[pk] += 1
+            due = (
+                sum(self._clicks.values()) >= self.batch
+                or time.monotonic() - self._flushed_at >= self.interval
+            )
+        if due:
+            self.flush()
+        return pk
+
+    def flush(self):
+        with self._lock:
+            clicks, self._clicks = self._clicks, Counter()
+            self._flushed_at = time.monotonic()
+        if not clicks:
+            return
+        Recipe.objects.filter(pk__in=clicks).update(
+            short_link_clicks=F('short_link_clicks') + Case(
+                *(When(pk=pk, then=Value(count))
+                  for pk, count in clicks.items()),
+                default=Value(0)
+            )
+        )
+
+
+short_link_resolver = ShortLinkResolver()
+atexit.register(short_link_resolver.flush)
@@ -0,0 +1,230 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .cache import (INGREDIENTS_VERSION, RECIPES_VERSION, TAGS_VERSION,
+                    bump_version, recipe_version, token_version, user_version)
+from .images import create_renditions
+from .models import (Cart, Favorite, Follow, Ingredient, IngredientRecipe,
+                     Recipe, Tag)
+from .search import update_search_documents
+from .shopping_list import change_cart, replace_ingredient_recipe
+from .short_links import short_link_resolver
+
+User = get_user_model()
+
+
+def change_counter(model, pk, field, delta):
+    change_counters(model, [pk], field, delta)
+
+
+def change_counters(model, pks, field, delta):
+    model.objects.filter(pk__in=pks).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def carts_changed(user_id, recipe_ids, sign):
+    """Учитывает добавление (sign=1) или удаление (sign=-1) рецептов
+    из корзины; массовые операции вызывают её напрямую."""
+    change_cart(user_id, recipe_ids, sign)
+    change_counters(Recipe, recipe_ids, 'carts_count', sign)
+    bump_version(user_version(user_id))
+
+
+def favorites_changed(user_id, recipe_ids, sign):
+    change_counters(Recipe, recipe_ids, 'favorites_count', sign)
+    bump_version(user_version(user_id))
+
+
+def bump_recipe_versions(*recipe_ids):
+    bump_version(
+        RECIPES_VERSION,
+        *(recipe_version(recipe_id) for recipe_id in recipe_ids)
+    )
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    bump_version(INGREDIENTS_VERSION)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(sender, instance, created, **kwargs):
+    if created:
+        return
+    recipe_ids = list(instance.ingredientrecipe_set.values_list(
+        'recipe_id', flat=True
+    ))
+    if recipe_ids:
+        update_search_documents(recipe_ids)
+        bump_recipe_versions(*recipe_ids)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, **kwargs):
+    bump_version(TAGS_VERSION)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    bump_recipe_versions(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, update_fields, **kwargs):
+    if update_fields is None or {'name', 'text'} & update_fields:
+        update_search_documents([instance.pk])
+
+
+def update_tags_masks(recipe_ids):
+    masks = dict.fromkeys(recipe_ids, 0)
+    for recipe_id, bit in Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'tag__bit'):
+        masks[recipe_id] |= 1 << bit
+    Recipe.objects.bulk_update(
+        [Recipe(pk=pk, tags_mask=mask) for pk, mask in masks.items()],
+        ('tags_mask',)
+    )
+
+
+def clear_tag_bit(tag):
+    Recipe.objects.filter(tags_mask__gt=0).update(
+        tags_mask=F('tags_mask').bitand(~tag.mask)
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        update_tags_masks([instance.pk])
+        bump_recipe_versions(instance.pk)
+    elif pk_set:
+        update_tags_masks(pk_set)
+        bump_recipe_versions(*pk_set)
+    else:
+        clear_tag_bit(instance)
+        bump_version(RECIPES_VERSION)
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    clear_tag_bit(instance)
+    bump_version(RECIPES_VERSION)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    recipe_ids = list(instance.recipes.values_list('pk', flat=True))
+    if recipe_ids:
+        bump_recipe_versions(*recipe_ids)
+
+
+@receiver(post_save, sender=User)
+def user_credentials_changed(sender, instance, created, update_fields,
+                             **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    bump_version(*(
+        token_version(key) for key in Token.objects.filter(
+            user=instance
+        ).values_list('key', flat=True)
+    ))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    bump_version(token_version(instance.key))
+
+
+@receiver(post_save, sender=Cart)
+def cart_created(sender, instance, created, **kwargs):
+    if created:
+        carts_changed(instance.user_id, [instance.recipe_id], 1)
+
+
+@receiver(post_delete, sender=Cart)
+def cart_deleted(sender, instance, **kwargs):
+    carts_changed(instance.user_id, [instance.recipe_id], -1)
+
+
+@receiver(post_save, sender=IngredientRecipe)
+def ingredient_recipe_saved(sender, instance, **kwargs):
+    old_values = getattr(instance, '_loaded_values', None)
+    new_values = instance.values_for_shopping_list()
+    replace_ingredient_recipe(old_values, new_values)
+    instance._loaded_values = new_values
+    recipe_ids = {instance.recipe_id}
+    if old_values is not None:
+        recipe_ids.add(old_values[0])
+    update_search_documents(recipe_ids)
+    bump_recipe_versions(*recipe_ids)
+
+
+@receiver(post_delete, sender=IngredientRecipe)
+def ingredient_recipe_deleted(sender, instance, **kwargs):
+    replace_ingredient_recipe(
+        getattr(
+            instance, '_loaded_values', instance.values_for_shopping_list()
+        ),
+        None
+    )
+    update_search_documents([instance.recipe_id])
+    bump_recipe_versions(instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+    short_link_resolver.forget(instance.pk)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(sender, instance, created, **kwargs):
+    if created:
+        favorites_changed(instance.user_id, [instance.recipe_id], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    favorites_changed(instance.user_id, [instance.recipe_id], -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.user_id, 'following_count', 1)
+        change_counter(User, instance.following_id, 'followers_count', 1)
+        bump_version(user_version(instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change_counter(User, instance.user_id, 'following_count', -1)
+    change_counter(User, instance.following_id, 'followers_count', -1)
+    bump_version(user_version(instance.user_id))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, **kwargs):
+    create_renditions(instance.image)
+
+
+@receiver(post_save, sender=User)
+def avatar_saved(sender, instance, **kwargs):
+    create_renditions(instance.avatar)
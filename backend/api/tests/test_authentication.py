@@ -0,0 +1,91 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import CachedTokenAuthentication, TTLCache
+from api.constants import AUTH_CACHE_SIZE, AUTH_CACHE_TTL
+from api.tests.utils import FoodgramTestCase
+
+
+class CachedTokenAuthenticationTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(
+            CachedTokenAuthentication, 'users',
+            TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.token = Token.objects.create(user=self.author)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_me(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/users/me/')
+        token_queries = [
+            query for query in queries
+            if Token._meta.db_table in query['sql']
+        ]
+        return response.status_code, len(token_queries)
+
+    def test_second_request_skips_token_lookup(self):
+        self.assertEqual(self.get_me(), (200, 1))
+        self.assertEqual(self.get_me(), (200, 0))
+
+    def test_logout(self):
+        self.get_me()
+        response = self.request(self.client, 'post', '/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.get_me()[0], 401)
+
+    def test_password_change(self):
+        self.get_me()
+        response = self.request(
+            self.client, 'post', '/api/users/set_password/',
+            {'current_password': 'pass-12345',
+             'new_password': 'new-pass-67890'}
+        )
+        self.assertEqual(response.status_code, 204, response.content)
+        self.assertEqual(self.get_me()[0], 401)
+
+    def test_deactivation_with_save(self):
+        self.get_me()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.is_active = False
+            self.author.save()
+        self.assertEqual(self.get_me()[0], 401)
+
+    def test_profile_change_reloads_user(self):
+        self.get_me()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.first_name = 'Шеф'
+            self.author.save()
+        self.assertEqual(self.get_me(), (200, 1))
+        self.assertEqual(
+            self.client.get('/api/users/me/').data['first_name'], 'Шеф'
+        )
+
+    def test_cached_user_is_not_shared(self):
+        type(self.author).objects.filter(pk=self.author.pk).update(
+            avatar='users/avatar.png'
+        )
+        authentication = CachedTokenAuthentication()
+        first, first_token = authentication.authenticate_credentials(
+            self.token.key
+        )
+        second, second_token = authentication.authenticate_credentials(
+            self.token.key
+        )
+        self.assertIsNot(first, second)
+        self.assertIsNot(first.avatar, second.avatar)
+        self.assertIs(first_token.user, first)
+        first.first_name = 'Изменено'
+        first._state.fields_cache['extra'] = object()
+        third, _ = authentication.authenticate_credentials(self.token.key)
+        self.assertEqual(third.first_name, 'Автор')
+        self.assertNotIn('extra', third._state.fields_cache)
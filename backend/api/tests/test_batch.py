@@ -0,0 +1,95 @@
+from unittest import mock
+
+from api.models import (Cart, Favorite, Recipe, SelectRecipeQuerySet,
+                        ShoppingListItem)
+from api.tests.utils import FoodgramTestCase
+
+
+class BatchRelationTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.borscht_id = self.create_recipe()
+        self.salad_id = self.create_recipe(
+            name='Салат', ingredients=((self.beet, 50), (self.egg, 2))
+        )
+
+    def batch(self, method, relation, recipe_ids):
+        response = self.request(
+            self.reader_client, method, f'/api/recipes/{relation}/',
+            {'recipes': recipe_ids}
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return {item['id']: item['status'] for item in response.data}
+
+    def test_cart_batch_statuses_and_bookkeeping(self):
+        self.request(
+            self.reader_client, 'post',
+            f'/api/recipes/{self.borscht_id}/shopping_cart/'
+        )
+        statuses = self.batch(
+            'post', 'shopping_cart', [self.borscht_id, self.salad_id, 999]
+        )
+        self.assertEqual(
+            statuses, {self.borscht_id: 400, self.salad_id: 201, 999: 404}
+        )
+        self.assertEqual(
+            Recipe.objects.get(pk=self.salad_id).carts_count, 1
+        )
+        self.assertEqual(
+            dict(ShoppingListItem.objects.filter(
+                user=self.reader
+            ).values_list('ingredient__name', 'amount')),
+            {'свёкла': 250, 'капуста': 100, 'яйцо': 2}
+        )
+
+        statuses = self.batch(
+            'delete', 'shopping_cart', [self.borscht_id, self.salad_id]
+        )
+        self.assertEqual(
+            statuses, {self.borscht_id: 204, self.salad_id: 204}
+        )
+        self.assertFalse(Cart.objects.filter(user=self.reader).exists())
+        self.assertFalse(
+            ShoppingListItem.objects.filter(user=self.reader).exists()
+        )
+        self.assertEqual(
+            set(Recipe.objects.values_list('carts_count', flat=True)), {0}
+        )
+
+    def test_concurrent_insert_is_not_counted_twice(self):
+        self.request(
+            self.author_client, 'post',
+            f'/api/recipes/{self.borscht_id}/favorite/'
+        )
+        self.request(
+            self.reader_client, 'post',
+            f'/api/recipes/{self.borscht_id}/favorite/'
+        )
+        values_list = SelectRecipeQuerySet.values_list
+        lookups = []
+
+        def stale_first_lookup(queryset, *fields, **kwargs):
+            # Первый поиск не видит связь, добавленную параллельным
+            # запросом: вставка упирается в уникальность
+            lookups.append(fields)
+            if len(lookups) == 1:
+                return []
+            return values_list(queryset, *fields, **kwargs)
+
+        with mock.patch.object(
+            SelectRecipeQuerySet, 'values_list', autospec=True,
+            side_effect=stale_first_lookup
+        ):
+            statuses = self.batch(
+                'post', 'favorite', [self.borscht_id, self.salad_id]
+            )
+        self.assertEqual(len(lookups), 2)
+        self.assertEqual(
+            statuses, {self.borscht_id: 400, self.salad_id: 201}
+        )
+        self.assertEqual(
+            dict(Recipe.objects.values_list('pk', 'favorites_count')),
+            {self.borscht_id: 2, self.salad_id: 1}
+        )
+        self.assertEqual(Favorite.objects.filter(user=self.reader).count(), 2)
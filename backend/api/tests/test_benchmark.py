@@ -0,0 +1,46 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+
+from api.tests.utils import FoodgramTestCase
+
+
+class BenchmarkCommandTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        self.output = os.path.join(directory, 'benchmark.json')
+        self.addCleanup(
+            lambda: os.path.exists(self.output) and os.remove(self.output)
+        )
+
+    def benchmark(self, *args):
+        # Как в продакшене без DEBUG и с незаданным ALLOWED_HOSTS
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['']):
+            call_command(
+                'benchmark', '--output', self.output, *args, stdout=StringIO()
+            )
+        with open(self.output, encoding='utf-8') as file:
+            return json.load(file)
+
+    def test_in_process_requests_reach_the_api(self):
+        self.create_recipe()
+        report = self.benchmark('--users', '2', '--requests', '40')
+        self.assertEqual(report['total']['requests'], 40)
+        self.assertEqual(report['total']['errors'], 0)
+
+    def test_error_rate_fails_the_run(self):
+        workload = self.output + '.jsonl'
+        self.addCleanup(os.remove, workload)
+        with open(workload, 'w', encoding='utf-8') as file:
+            for path in ('/api/tags/', '/api/recipes/999/'):
+                file.write(json.dumps({'method': 'GET', 'path': path}) + '\n')
+        with self.assertRaisesMessage(CommandError, 'Ошибок: 1 из 2'):
+            self.benchmark('--workload', workload)
+        self.benchmark('--workload', workload, '--max-error-rate', '0.5')
@@ -0,0 +1,116 @@
+from rest_framework.test import APIClient
+
+from api.models import Recipe, Tag
+from api.tests.utils import FoodgramTestCase
+
+
+class ResponseCacheTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.anonymous_client = APIClient()
+
+    def recipe_names(self):
+        response = self.anonymous_client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['name'] for recipe in response.json()['results']]
+
+    def test_anonymous_list_is_cached_until_recipe_changes(self):
+        recipe_id = self.create_recipe()
+        self.assertEqual(self.recipe_names(), ['Борщ'])
+
+        # Изменение в обход сигналов не меняет версию: ответ из кэша
+        Recipe.objects.filter(pk=recipe_id).update(name='Щи')
+        self.assertEqual(self.recipe_names(), ['Борщ'])
+
+        response = self.request(
+            self.author_client, 'patch', f'/api/recipes/{recipe_id}/',
+            self.recipe_data(name='Свекольник')
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.recipe_names(), ['Свекольник'])
+
+    def test_new_recipe_invalidates_list(self):
+        self.create_recipe()
+        self.assertEqual(self.recipe_names(), ['Борщ'])
+        self.create_recipe(name='Омлет', ingredients=((self.egg, 3),))
+        self.assertEqual(self.recipe_names(), ['Омлет', 'Борщ'])
+
+    def test_tag_list_invalidated_by_new_tag(self):
+        response = self.anonymous_client.get('/api/tags/')
+        self.assertEqual(len(response.json()), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Десерт', slug='dessert')
+        response = self.anonymous_client.get('/api/tags/')
+        self.assertEqual(len(response.json()), 4)
+
+    def test_version_is_not_bumped_before_commit(self):
+        self.create_recipe()
+        self.assertEqual(self.recipe_names(), ['Борщ'])
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.author_client.post('/api/recipes/', self.recipe_data(
+                name='Омлет', ingredients=((self.egg, 3),)
+            ), format='json')
+        self.assertEqual(self.recipe_names(), ['Борщ'])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.recipe_names(), ['Омлет', 'Борщ'])
+
+
+class ConditionalGetTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipe_id = self.create_recipe()
+        self.path = f'/api/recipes/{self.recipe_id}/'
+
+    def test_not_modified_until_recipe_changes(self):
+        response = self.reader_client.get(self.path)
+        etag = response['ETag']
+        response = self.reader_client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.request(
+            self.author_client, 'patch', self.path,
+            self.recipe_data(name='Свекольник')
+        )
+        response = self.reader_client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Свекольник')
+
+    def test_if_modified_since_is_not_a_validator(self):
+        response = self.reader_client.get(self.path)
+        self.assertNotIn('Last-Modified', response)
+        response = self.reader_client.get(
+            self.path, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_flags_change_etag(self):
+        etag = self.reader_client.get(self.path)['ETag']
+        self.request(self.reader_client, 'post', f'{self.path}favorite/')
+        response = self.reader_client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_favorited'])
+
+
+class ReferencePayloadTests(FoodgramTestCase):
+
+    def test_gzip_and_identity_bodies_have_different_etags(self):
+        client = APIClient()
+        identity = client.get('/api/tags/')
+        gzipped = client.get('/api/tags/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Encoding', identity)
+        self.assertNotEqual(identity['ETag'], gzipped['ETag'])
+
+        response = client.get(
+            '/api/tags/', HTTP_IF_NONE_MATCH=identity['ETag'],
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response.status_code, 200)
+        response = client.get(
+            '/api/tags/', HTTP_IF_NONE_MATCH=gzipped['ETag'],
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+
+from api.models import Recipe, ShoppingListItem
+from api.tests.utils import FoodgramTestCase
+
+User = get_user_model()
+
+
+class CountersTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipe_id = self.create_recipe()
+
+    def counters(self):
+        return Recipe.objects.values(
+            'favorites_count', 'carts_count'
+        ).get(pk=self.recipe_id)
+
+    def test_favorites_and_carts_counters(self):
+        for relation in ('favorite', 'shopping_cart'):
+            self.request(
+                self.reader_client, 'post',
+                f'/api/recipes/{self.recipe_id}/{relation}/'
+            )
+        self.request(
+            self.author_client, 'post',
+            f'/api/recipes/{self.recipe_id}/favorite/'
+        )
+        self.assertEqual(
+            self.counters(), {'favorites_count': 2, 'carts_count': 1}
+        )
+
+        self.request(
+            self.reader_client, 'delete',
+            f'/api/recipes/{self.recipe_id}/favorite/'
+        )
+        self.request(
+            self.reader_client, 'delete',
+            f'/api/recipes/{self.recipe_id}/shopping_cart/'
+        )
+        self.assertEqual(
+            self.counters(), {'favorites_count': 1, 'carts_count': 0}
+        )
+
+    def test_recipes_and_followers_counters(self):
+        self.request(
+            self.reader_client, 'post',
+            f'/api/users/{self.author.pk}/subscribe/'
+        )
+        author = User.objects.get(pk=self.author.pk)
+        reader = User.objects.get(pk=self.reader.pk)
+        self.assertEqual(author.recipes_count, 1)
+        self.assertEqual(author.followers_count, 1)
+        self.assertEqual(reader.following_count, 1)
+
+        self.request(
+            self.author_client, 'delete', f'/api/recipes/{self.recipe_id}/'
+        )
+        self.request(
+            self.reader_client, 'delete',
+            f'/api/users/{self.author.pk}/subscribe/'
+        )
+        author = User.objects.get(pk=self.author.pk)
+        self.assertEqual(author.recipes_count, 0)
+        self.assertEqual(author.followers_count, 0)
+
+    def test_save_keeps_counters_changed_concurrently(self):
+        recipe = Recipe.objects.get(pk=self.recipe_id)
+        author = User.objects.get(pk=self.author.pk)
+        # Пока объекты в памяти, счётчики меняются другими запросами
+        self.request(
+            self.reader_client, 'post',
+            f'/api/recipes/{self.recipe_id}/favorite/'
+        )
+        self.request(
+            self.reader_client, 'post',
+            f'/api/users/{self.author.pk}/subscribe/'
+        )
+        recipe.name = 'Свекольник'
+        recipe.save()
+        author.set_password('new-pass-12345')
+        author.save()
+
+        recipe = Recipe.objects.get(pk=self.recipe_id)
+        self.assertEqual(recipe.name, 'Свекольник')
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).followers_count, 1
+        )
+
+
+class ShoppingListTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.borscht_id = self.create_recipe()
+        self.salad_id = self.create_recipe(
+            name='Салат', ingredients=((self.beet, 50), (self.egg, 2))
+        )
+        for recipe_id in (self.borscht_id, self.salad_id):
+            self.request(
+                self.reader_client, 'post',
+                f'/api/recipes/{recipe_id}/shopping_cart/'
+            )
+
+    def shopping_list(self):
+        return dict(ShoppingListItem.objects.filter(
+            user=self.reader
+        ).values_list('ingredient__name', 'amount'))
+
+    def test_cart_sums_ingredients(self):
+        self.assertEqual(
+            self.shopping_list(),
+            {'свёкла': 250, 'капуста': 100, 'яйцо': 2}
+        )
+
+    def test_recipe_edit_updates_carts(self):
+        self.request(
+            self.author_client, 'patch', f'/api/recipes/{self.borscht_id}/',
+            self.recipe_data(
+                ingredients=((self.beet, 300), (self.potato, 150))
+            )
+        )
+        self.assertEqual(
+            self.shopping_list(),
+            {'свёкла': 350, 'картофель': 150, 'яйцо': 2}
+        )
+
+    def test_removal_and_recipe_deletion(self):
+        self.request(
+            self.reader_client, 'delete',
+            f'/api/recipes/{self.salad_id}/shopping_cart/'
+        )
+        self.assertEqual(
+            self.shopping_list(), {'свёкла': 200, 'капуста': 100}
+        )
+        self.request(
+            self.author_client, 'delete', f'/api/recipes/{self.borscht_id}/'
+        )
+        self.assertEqual(self.shopping_list(), {})
@@ -0,0 +1,58 @@
+from rest_framework.test import APIClient
+
+from api.models import Recipe
+from api.tests.utils import FoodgramTestCase
+
+
+class TagFilterTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.borscht_id = self.create_recipe(tags=(self.lunch,))
+        self.omelette_id = self.create_recipe(
+            name='Омлет', tags=(self.breakfast, self.dinner),
+            ingredients=((self.egg, 3),)
+        )
+
+    def filtered(self, query):
+        response = APIClient().get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.json()['results']}
+
+    def test_any_and_all_tags(self):
+        self.assertEqual(self.filtered('tags=lunch'), {self.borscht_id})
+        self.assertEqual(
+            self.filtered('tags=lunch&tags=dinner'),
+            {self.borscht_id, self.omelette_id}
+        )
+        self.assertEqual(
+            self.filtered('all_tags=breakfast&all_tags=dinner'),
+            {self.omelette_id}
+        )
+        self.assertEqual(
+            self.filtered('all_tags=lunch&all_tags=dinner'), set()
+        )
+
+    def test_patched_tags_are_filtered(self):
+        response = self.request(
+            self.author_client, 'patch', f'/api/recipes/{self.borscht_id}/',
+            self.recipe_data(tags=(self.breakfast,))
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.borscht_id).tags_mask,
+            self.breakfast.mask
+        )
+        self.assertEqual(self.filtered('tags=lunch'), set())
+        self.assertEqual(
+            self.filtered('tags=breakfast'),
+            {self.borscht_id, self.omelette_id}
+        )
+
+    def test_deleted_tag_is_cleared_from_masks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dinner.delete()
+        self.assertEqual(
+            Recipe.objects.get(pk=self.omelette_id).tags_mask,
+            self.breakfast.mask
+        )
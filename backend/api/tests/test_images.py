@@ -0,0 +1,136 @@
+import base64
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from PIL import Image
+
+from api.images import create_renditions, rendition_names
+from api.models import Recipe
+from api.tests.utils import FoodgramTestCase, image_data
+
+User = get_user_model()
+
+
+class Base64ImageTests(FoodgramTestCase):
+
+    def test_line_breaks_in_base64_are_accepted(self):
+        header, encoded = image_data().split(',')
+        wrapped = '\n'.join(
+            encoded[start:start + 76] for start in range(0, len(encoded), 76)
+        )
+        data = self.recipe_data()
+        data['image'] = f'{header},{wrapped}\r\n'
+        response = self.request(
+            self.author_client, 'post', '/api/recipes/', data
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(
+            Recipe.objects.get(pk=response.data['id']).image.name.endswith(
+                '.png'
+            )
+        )
+
+    def post_image(self, image):
+        data = self.recipe_data()
+        data['image'] = image
+        return self.request(self.author_client, 'post', '/api/recipes/', data)
+
+    @mock.patch('api.serializers.BASE64_CHUNK_SIZE', 10)
+    def test_whitespace_across_chunks(self):
+        header, encoded = image_data().split(',')
+        # Пробелы сдвигают группы base64 относительно границ частей
+        spaced = ' '.join(
+            encoded[start:start + 7] for start in range(0, len(encoded), 7)
+        )
+        response = self.post_image(f'{header},{spaced}')
+        self.assertEqual(response.status_code, 201, response.content)
+        image = Recipe.objects.get(pk=response.data['id']).image
+        with image.open('rb'):
+            self.assertEqual(image.read(), base64.b64decode(encoded))
+
+    def test_size_is_checked_without_whitespace(self):
+        header, encoded = image_data().split(',')
+        size = len(base64.b64decode(encoded))
+        wrapped = '\n\n'.join(encoded)
+        with override_settings(MAX_IMAGE_SIZE=size):
+            response = self.post_image(f'{header},{wrapped}')
+            self.assertEqual(response.status_code, 201, response.content)
+        with override_settings(MAX_IMAGE_SIZE=size - 1):
+            response = self.post_image(image_data('blue'))
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Размер изображения', str(response.data['image']))
+
+    def test_incomplete_base64_is_rejected(self):
+        response = self.post_image(image_data()[:-1])
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_base64_is_rejected(self):
+        data = self.recipe_data()
+        data['image'] = 'data:image/png;base64,не-base64'
+        response = self.request(
+            self.author_client, 'post', '/api/recipes/', data
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+
+
+class RenditionTests(FoodgramTestCase):
+    """Производные изображения создаются при сохранении рецепта и аватара."""
+
+    sizes = {'thumbnail': (160, 120), 'card': (480, 360), 'full': (1280, 960)}
+
+    def assert_renditions(self, field_file, mode):
+        for rendition, names in rendition_names(field_file.name).items():
+            for extension, name in names.items():
+                with self.subTest(rendition=rendition, extension=extension):
+                    with field_file.storage.open(name) as file:
+                        image = Image.open(file)
+                        image.load()
+                    self.assertEqual(image.format, extension.upper())
+                    self.assertEqual(image.size, self.sizes[rendition])
+                    self.assertEqual(
+                        image.mode, mode if extension == 'webp' else 'RGB'
+                    )
+
+    def test_recipe_image(self):
+        data = self.recipe_data()
+        data['image'] = image_data(size=(1600, 1200))
+        response = self.request(
+            self.author_client, 'post', '/api/recipes/', data
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assert_renditions(
+            Recipe.objects.get(pk=response.data['id']).image, 'RGB'
+        )
+
+    def test_avatar_keeps_transparency_in_webp(self):
+        response = self.request(
+            self.author_client, 'put', '/api/users/me/avatar/',
+            {'avatar': image_data(
+                (255, 0, 0, 128), size=(1600, 1200), mode='RGBA'
+            )}
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        avatar = User.objects.get(pk=self.author.pk).avatar
+        self.assert_renditions(avatar, 'RGBA')
+        name = rendition_names(avatar.name)['card']['jpeg']
+        with avatar.storage.open(name) as file:
+            red, green, blue = Image.open(file).getpixel((0, 0))
+        # Полупрозрачный красный на белом фоне, а не на чёрном
+        self.assertGreater(green, 100)
+
+    def test_existing_renditions_are_kept(self):
+        recipe = Recipe.objects.get(pk=self.create_recipe())
+        storage = recipe.image.storage
+        names = rendition_names(recipe.image.name)
+        modified = {
+            name: storage.get_modified_time(name)
+            for rendition in names.values() for name in rendition.values()
+        }
+        create_renditions(recipe.image)
+        recipe.save()
+        self.assertEqual(
+            {name: storage.get_modified_time(name) for name in modified},
+            modified
+        )
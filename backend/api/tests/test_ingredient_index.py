@@ -0,0 +1,55 @@
+from rest_framework.test import APIClient
+
+from api.ingredient_index import ingredient_index
+from api.models import Ingredient
+from api.tests.utils import FoodgramTestCase
+
+
+class IngredientIndexTests(FoodgramTestCase):
+
+    def names(self, prefix, **kwargs):
+        return [
+            item['name'] for item in ingredient_index.search(prefix, **kwargs)
+        ]
+
+    def test_case_insensitive_prefix(self):
+        self.assertEqual(self.names('КАП'), ['капуста'])
+        self.assertEqual(self.names('к'), ['капуста', 'картофель'])
+        self.assertEqual(self.names('пельмени'), [])
+
+    def test_limit_and_order(self):
+        Ingredient.objects.bulk_create([
+            Ingredient(name=name, measurement_unit='г')
+            for name in ('Кабачок', 'какао', 'Калина', 'кефир')
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='Кешью', measurement_unit='г')
+        self.assertEqual(
+            self.names('к'),
+            ['Кабачок', 'какао', 'Калина', 'капуста', 'картофель', 'кефир',
+             'Кешью']
+        )
+        self.assertEqual(
+            self.names('к', limit=3), ['Кабачок', 'какао', 'Калина']
+        )
+
+    def test_rebuilt_after_change(self):
+        self.assertEqual(self.names('сахар'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='Сахар', measurement_unit='г')
+        self.assertEqual(self.names('сах'), ['Сахар'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cabbage.name = 'брокколи'
+            self.cabbage.save()
+        self.assertEqual(self.names('кап'), [])
+        response = APIClient().get('/api/ingredients/?name=БРОК')
+        self.assertEqual(
+            [item['name'] for item in response.json()], ['брокколи']
+        )
+
+    def test_unchanged_version_does_not_rebuild(self):
+        self.names('к')
+        Ingredient.objects.filter(pk=self.cabbage.pk).update(name='ананас')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names('кап'), ['капуста'])
@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from api.management.commands import load_ingredients
+from api.models import Ingredient
+
+
+class IterJsonTests(SimpleTestCase):
+
+    def parse(self, text):
+        # Маленькие порции проверяют склейку буфера на границах чтения
+        with mock.patch.object(load_ingredients, 'READ_CHUNK_SIZE', 7):
+            return list(load_ingredients.iter_json(StringIO(text)))
+
+    def test_streams_objects(self):
+        items = [
+            {'name': f'ингредиент {number}', 'measurement_unit': 'г'}
+            for number in range(20)
+        ]
+        self.assertEqual(
+            self.parse(json.dumps(items, ensure_ascii=False, indent=2)),
+            [(item['name'], item['measurement_unit']) for item in items]
+        )
+        self.assertEqual(self.parse(' [ ] '), [])
+
+    def test_rejects_malformed_arrays(self):
+        for text in (
+            '[{"name": "a", "measurement_unit": "г"}'
+            '{"name": "b", "measurement_unit": "г"}]',
+            '[{"name": "a", "measurement_unit": "г"},]',
+            '[,{"name": "a", "measurement_unit": "г"}]',
+            '[{"name": "a", "measurement_unit": "г"}',
+            '["a"]',
+            '{"name": "a", "measurement_unit": "г"}',
+        ):
+            with self.subTest(text=text):
+                with self.assertRaises(CommandError):
+                    self.parse(text)
+
+
+class IterCsvTests(SimpleTestCase):
+
+    def test_skips_blank_lines(self):
+        self.assertEqual(
+            list(load_ingredients.iter_csv(StringIO('мука,г\n\nяйцо,шт\n'))),
+            [('мука', 'г'), ('яйцо', 'шт')]
+        )
+
+    def test_short_row_reports_line_number(self):
+        # Номер строки файла: поле в кавычках занимает две строки
+        with self.assertRaisesMessage(CommandError, 'Строка 4'):
+            list(load_ingredients.iter_csv(
+                StringIO('мука,г\n"соль,\nкрупная",г\nсахар\n')
+            ))
+
+
+class LoadIngredientsTests(TestCase):
+
+    def load(self, content, suffix, *args):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix=suffix, encoding='utf-8', delete=False
+        ) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        call_command(
+            'load_ingredients', file.name, *args, stdout=StringIO()
+        )
+
+    def test_loads_json_and_skips_duplicates(self):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        self.load(json.dumps([
+            {'name': 'соль', 'measurement_unit': 'г'},
+            {'name': ' сахар ', 'measurement_unit': 'г'},
+            {'name': 'сахар', 'measurement_unit': 'г'},
+        ]), '.json')
+        self.assertEqual(
+            sorted(Ingredient.objects.values_list('name', flat=True)),
+            ['сахар', 'соль']
+        )
+
+    def test_loads_csv(self):
+        self.load('мука,г\nяйцо,шт\n', '.csv')
+        self.assertEqual(Ingredient.objects.count(), 2)
+
+    def test_rejects_non_positive_batch_size(self):
+        for batch_size in ('0', '-5'):
+            with self.subTest(batch_size=batch_size):
+                with self.assertRaises(CommandError):
+                    self.load('мука,г\n', '.csv', '--batch-size', batch_size)
+        self.assertFalse(Ingredient.objects.exists())
@@ -0,0 +1,43 @@
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import SimpleTestCase, TestCase
+
+from api.metrics import Metrics, QueryStats, current_queries, record_query
+
+
+class QueryWrapperTests(TestCase):
+
+    def test_reconnects_do_not_stack_wrappers(self):
+        # Так сигнал приходит при переподключениях с CONN_MAX_AGE=0
+        for _ in range(4):
+            connection_created.send(
+                sender=connection.__class__, connection=connection
+            )
+        self.assertEqual(connection.execute_wrappers.count(record_query), 1)
+
+        stats = QueryStats()
+        token = current_queries.set(stats)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        finally:
+            current_queries.reset(token)
+        self.assertEqual(stats.count, 1)
+
+
+class MetricsRenderTests(SimpleTestCase):
+
+    def test_prometheus_text(self):
+        metrics = Metrics()
+        queries = QueryStats()
+        queries.count = 3
+        metrics.observe('recipes-list', 'GET', 200, 0.02, queries, 512)
+        text = metrics.render()
+        self.assertIn(
+            'foodgram_requests_total{view="recipes-list",method="GET",'
+            'status="200"} 1', text
+        )
+        self.assertIn(
+            'foodgram_request_sql_queries_count{view="recipes-list",'
+            'method="GET"} 1', text
+        )
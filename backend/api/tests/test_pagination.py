@@ -0,0 +1,74 @@
+from urllib.parse import quote
+
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from api.tests.utils import FoodgramTestCase
+
+User = get_user_model()
+
+
+class CursorPaginationTests(FoodgramTestCase):
+    """Обход по курсору отдаёт каждую запись ровно один раз."""
+
+    def walk(self, client, path):
+        pages = []
+        while path:
+            response = client.get(path)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertNotIn('count', response.data)
+            pages.append([item['id'] for item in response.data['results']])
+            path = response.data['next']
+        return pages
+
+    def test_recipes(self):
+        recipe_ids = [
+            self.create_recipe(name=f'Рецепт {number}')
+            for number in range(7)
+        ]
+        for client in (APIClient(), self.reader_client):
+            with self.subTest(user=client is self.reader_client):
+                pages = self.walk(client, '/api/recipes/?limit=3&cursor=')
+                self.assertEqual([len(page) for page in pages], [3, 3, 1])
+                self.assertEqual(sum(pages, []), recipe_ids[::-1])
+
+    def test_recipes_search(self):
+        borscht_ids = [
+            self.create_recipe(name=f'Борщ {number}') for number in range(5)
+        ]
+        self.create_recipe(name='Омлет', text='Яйца и молоко')
+        # Клиенты передают строку запроса в процентной кодировке
+        pages = self.walk(
+            APIClient(),
+            f'/api/recipes/?search={quote("борщ")}&limit=2&cursor='
+        )
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sorted(sum(pages, [])), borscht_ids)
+
+    def test_subscriptions(self):
+        author_ids = [self.author.pk]
+        for number in range(4):
+            author = User.objects.create_user(
+                email=f'cook{number}@example.com', username=f'cook{number}',
+                first_name='Повар', last_name=str(number),
+                password='pass-12345'
+            )
+            author_ids.append(author.pk)
+        for pk in author_ids:
+            response = self.request(
+                self.reader_client, 'post', f'/api/users/{pk}/subscribe/'
+            )
+            self.assertEqual(response.status_code, 201, response.content)
+        pages = self.walk(
+            self.reader_client, '/api/users/subscriptions/?limit=2&cursor='
+        )
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), sorted(author_ids, reverse=True))
+
+    def test_empty_cursor_is_not_served_from_page_cache(self):
+        self.create_recipe()
+        client = APIClient()
+        self.assertIn('count', client.get('/api/recipes/?limit=3').data)
+        response = client.get('/api/recipes/?limit=3&cursor=').json()
+        self.assertNotIn('count', response)
+        self.assertEqual(len(response['results']), 1)
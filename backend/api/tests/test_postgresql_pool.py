@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from foodgram_backend.postgresql_pool import base
+from psycopg2 import DatabaseError, OperationalError, extensions
+
+
+def make_connection(status=extensions.TRANSACTION_STATUS_IDLE, closed=0):
+    connection = mock.MagicMock(closed=closed, autocommit=True)
+    connection.info.transaction_status = status
+    return connection
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """ConnectionPool поверх подменённого ThreadedConnectionPool."""
+
+    def setUp(self):
+        patcher = mock.patch.object(base, 'ThreadedConnectionPool')
+        self.pool_class = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.threaded_pool = self.pool_class.return_value
+        self.connections = [make_connection() for _ in range(3)]
+        self.threaded_pool.getconn.side_effect = self.connections
+
+    def make_pool(self, max_size=2, health_checks=False):
+        return base.ConnectionPool(
+            1, max_size, 0, health_checks, {'dbname': 'foodgram'}
+        )
+
+    def test_checkout_and_return(self):
+        pool = self.make_pool()
+        self.pool_class.assert_called_once_with(1, 2, dbname='foodgram')
+        connection = pool.getconn()
+        self.assertIs(connection, self.connections[0])
+        pool.putconn(connection)
+        connection.rollback.assert_not_called()
+        self.threaded_pool.putconn.assert_called_once_with(
+            connection, close=False
+        )
+
+    def test_open_transaction_is_rolled_back_on_return(self):
+        pool = self.make_pool()
+        connection = pool.getconn()
+        connection.info.transaction_status = (
+            extensions.TRANSACTION_STATUS_INTRANS
+        )
+        pool.putconn(connection)
+        connection.rollback.assert_called_once_with()
+        self.threaded_pool.putconn.assert_called_once_with(
+            connection, close=False
+        )
+
+    def test_semaphore_bounds_checked_out_connections(self):
+        pool = self.make_pool(max_size=2)
+        first = pool.getconn()
+        pool.getconn()
+        with self.assertRaises(OperationalError):
+            pool.getconn()
+        self.assertEqual(self.threaded_pool.getconn.call_count, 2)
+        pool.putconn(first)
+        self.assertIs(pool.getconn(), self.connections[2])
+
+    def test_failed_checkout_releases_slot(self):
+        self.threaded_pool.getconn.side_effect = [
+            OperationalError('нет соединения'), *self.connections
+        ]
+        pool = self.make_pool(max_size=1)
+        with self.assertRaises(OperationalError):
+            pool.getconn()
+        self.assertIs(pool.getconn(), self.connections[0])
+
+    def test_broken_connections_are_discarded(self):
+        failed_rollback = make_connection(
+            extensions.TRANSACTION_STATUS_INERROR
+        )
+        failed_rollback.rollback.side_effect = DatabaseError
+        for connection in (
+            make_connection(closed=2),
+            make_connection(extensions.TRANSACTION_STATUS_UNKNOWN),
+            failed_rollback,
+        ):
+            with self.subTest(connection=connection):
+                pool = self.make_pool(max_size=1)
+                pool.getconn()
+                pool.putconn(connection)
+                self.threaded_pool.putconn.assert_called_with(
+                    connection, close=True
+                )
+                # Слот освобождён и после выброшенного соединения
+                self.threaded_pool.getconn.side_effect = None
+                pool.getconn()
+
+    def test_health_check_replaces_dead_connection(self):
+        dead = self.connections[0]
+        dead.cursor.return_value.__enter__.return_value.execute.side_effect = (
+            OperationalError
+        )
+        pool = self.make_pool(health_checks=True)
+        self.assertIs(pool.getconn(), self.connections[1])
+        self.threaded_pool.putconn.assert_called_once_with(dead, close=True)
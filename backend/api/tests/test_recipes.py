@@ -0,0 +1,116 @@
+from rest_framework.test import APIClient
+
+from api.models import Ingredient, Recipe, ShoppingListItem
+from api.tests.utils import FoodgramTestCase
+
+
+class RecipeQueriesTests(FoodgramTestCase):
+    """Число запросов к базе не зависит от размера страницы."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe_ids = [
+            self.create_recipe(
+                name=f'Рецепт {number}',
+                tags=(self.lunch, self.dinner)[:number % 2 + 1],
+                ingredients=(
+                    (self.beet, 10 + number), (self.egg, 1),
+                    (self.potato, 100)
+                )
+            ) for number in range(13)
+        ]
+        self.request(
+            self.reader_client, 'post',
+            f'/api/users/{self.author.pk}/subscribe/'
+        )
+
+    def assert_queries(self, client, path, count):
+        with self.assertNumQueries(count):
+            response = client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list(self):
+        # count, рецепты, теги, ингредиенты; пользователю ещё его подписки
+        for client, count in ((APIClient(), 4), (self.reader_client, 5)):
+            for limit in (3, 13):
+                with self.subTest(user=client is self.reader_client,
+                                  limit=limit):
+                    response = self.assert_queries(
+                        client, f'/api/recipes/?limit={limit}', count
+                    )
+                    self.assertEqual(len(response.data['results']), limit)
+
+    def test_detail(self):
+        path = f'/api/recipes/{self.recipe_ids[0]}/'
+        self.assert_queries(APIClient(), path, 3)
+        response = self.assert_queries(self.reader_client, path, 4)
+        self.assertTrue(response.data['author']['is_subscribed'])
+        self.assertEqual(len(response.data['ingredients']), 3)
+
+
+class RecipeUpdateQueriesTests(FoodgramTestCase):
+    """Правка ингредиентов не порождает запросов на каждую строку."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.spices = [
+            Ingredient.objects.create(
+                name=f'специя {number}', measurement_unit='г'
+            ) for number in range(8)
+        ]
+
+    def assert_update(self, removed_spices):
+        recipe_id = self.create_recipe(ingredients=(
+            (self.beet, 200), (self.cabbage, 100),
+            *((spice, 5) for spice in self.spices[:removed_spices])
+        ))
+        self.request(
+            self.reader_client, 'post',
+            f'/api/recipes/{recipe_id}/shopping_cart/'
+        )
+        # Ингредиенты и корзины рецепта, правка строк, изменение списков
+        # покупок, сохранение рецепта с документом поиска и ответ
+        with self.assertNumQueries(26):
+            response = self.request(
+                self.author_client, 'patch', f'/api/recipes/{recipe_id}/',
+                self.recipe_data(ingredients=((self.beet, 300), (self.egg, 2)))
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            dict(ShoppingListItem.objects.filter(
+                user=self.reader
+            ).values_list('ingredient__name', 'amount')),
+            {'свёкла': 300, 'яйцо': 2}
+        )
+        document = Recipe.objects.get(pk=recipe_id).search_document
+        self.assertIn('яйцо', document)
+        self.assertNotIn('капуста', document)
+
+    def test_add_change_remove(self):
+        self.assert_update(removed_spices=0)
+
+    def test_removed_rows_do_not_add_queries(self):
+        self.assert_update(removed_spices=8)
+
+
+class RecipeValidationTests(FoodgramTestCase):
+
+    def test_all_missing_ids_reported_at_once(self):
+        data = self.recipe_data()
+        data['tags'] = [self.lunch.pk, 998, 999]
+        data['ingredients'] += [
+            {'id': 996, 'amount': 1}, {'id': 997, 'amount': 2}
+        ]
+        # Теги и ингредиенты ищутся одним запросом каждые
+        with self.assertNumQueries(2):
+            response = self.author_client.post(
+                '/api/recipes/', data, format='json'
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {
+            'tags': ['Объекты не существуют: 998, 999'],
+            'ingredients': ['Объекты не существуют: 996, 997'],
+        })
+        self.assertFalse(Recipe.objects.exists())
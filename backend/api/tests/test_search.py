@@ -0,0 +1,102 @@
+from django.db import connection
+from rest_framework.test import APIClient
+
+from api.models import Recipe
+from api.search import SQLITE_TRIGGER_NAMES, ensure_search_index
+from api.tests.utils import FoodgramTestCase
+
+
+class SearchTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.borscht_id = self.create_recipe(
+            name='Борщ', text='Настоящий борщ с капустой и свёклой',
+            tags=(self.lunch,)
+        )
+        self.shchi_id = self.create_recipe(
+            name='Щи', text='Почти как борщ, но без свёклы',
+            tags=(self.dinner,), ingredients=((self.cabbage, 300),)
+        )
+        self.omelette_id = self.create_recipe(
+            name='Омлет', text='Взбить и пожарить', tags=(self.breakfast,),
+            ingredients=((self.egg, 3),)
+        )
+
+    def search(self, query, client=None):
+        response = (client or APIClient()).get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_results_are_ranked(self):
+        self.assertEqual(
+            self.search('search=борщ'), [self.borscht_id, self.shchi_id]
+        )
+        for query in ('БОРЩ', 'бор'):
+            self.assertEqual(
+                self.search(f'search={query}'),
+                [self.borscht_id, self.shchi_id]
+            )
+        self.assertEqual(self.search('search=пельмени'), [])
+
+    def test_ingredient_names_are_searchable(self):
+        self.assertEqual(
+            set(self.search('search=капуста')),
+            {self.borscht_id, self.shchi_id}
+        )
+        self.assertEqual(self.search('search=яйцо'), [self.omelette_id])
+
+    def test_search_combines_with_filters(self):
+        self.assertEqual(
+            self.search('search=борщ&tags=dinner'), [self.shchi_id]
+        )
+        self.request(
+            self.reader_client, 'post',
+            f'/api/recipes/{self.borscht_id}/favorite/'
+        )
+        self.assertEqual(
+            self.search(
+                'search=борщ&is_favorited=1', client=self.reader_client
+            ),
+            [self.borscht_id]
+        )
+
+    def test_edits_update_the_index(self):
+        self.request(
+            self.author_client, 'patch', f'/api/recipes/{self.omelette_id}/',
+            self.recipe_data(
+                name='Драники', text='Натереть и пожарить',
+                ingredients=((self.potato, 500), (self.egg, 1))
+            )
+        )
+        self.assertEqual(self.search('search=омлет'), [])
+        self.assertEqual(self.search('search=драники'), [self.omelette_id])
+        self.assertEqual(
+            self.search('search=картофель'), [self.omelette_id]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.potato.name = 'картошка'
+            self.potato.save()
+        self.assertEqual(self.search('search=картошка'), [self.omelette_id])
+
+        self.request(
+            self.author_client, 'delete', f'/api/recipes/{self.shchi_id}/'
+        )
+        self.assertEqual(self.search('search=борщ'), [self.borscht_id])
+
+    def test_lost_triggers_are_restored(self):
+        # Так выглядит база после миграции, пересоздавшей api_recipe
+        with connection.cursor() as cursor:
+            for name in SQLITE_TRIGGER_NAMES:
+                cursor.execute(f'DROP TRIGGER {name}')
+        Recipe.objects.filter(pk=self.omelette_id).update(
+            search_document='Яичница'
+        )
+        ensure_search_index(connection)
+        self.assertEqual(self.search('search=яичница'), [self.omelette_id])
+        self.request(
+            self.author_client, 'patch', f'/api/recipes/{self.omelette_id}/',
+            self.recipe_data(name='Глазунья', ingredients=((self.egg, 2),))
+        )
+        self.assertEqual(self.search('search=глазунья'), [self.omelette_id])
@@ -0,0 +1,25 @@
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.tests.utils import FoodgramTestCase
+
+
+class DownloadShoppingCartTests(FoodgramTestCase):
+
+    def test_pdf_is_rendered_in_process_pool(self):
+        recipe_id = self.create_recipe()
+        self.request(
+            self.reader_client, 'post',
+            f'/api/recipes/{recipe_id}/shopping_cart/'
+        )
+        client = APIClient()
+        token = Token.objects.create(user=self.reader)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+    def test_anonymous_user_is_rejected(self):
+        response = APIClient().get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,49 @@
+from django.test import SimpleTestCase
+from rest_framework.test import APIClient
+
+from api.models import Recipe
+from api.short_links import MAX_PK, decode, encode, short_link_resolver
+from api.tests.utils import FoodgramTestCase
+
+
+class CodeTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        for pk in (0, 1, 61, 62, 12345, MAX_PK):
+            with self.subTest(pk=pk):
+                self.assertEqual(decode(encode(pk)), pk)
+
+    def test_invalid_codes(self):
+        for code in ('', '01', 'a-b', encode(MAX_PK + 1), 'z' * 20):
+            with self.subTest(code=code):
+                with self.assertRaises(ValueError):
+                    decode(code)
+
+
+class RedirectTests(FoodgramTestCase):
+
+    def test_redirect_and_click_counting(self):
+        recipe_id = self.create_recipe()
+        response = self.reader_client.get(
+            f'/api/recipes/{recipe_id}/get-link/'
+        )
+        link = response.data['short-link']
+        self.assertTrue(link.endswith(f'/s/{encode(recipe_id)}/'))
+
+        client = APIClient()
+        for _ in range(3):
+            response = client.get(f'/s/{encode(recipe_id)}/')
+            self.assertRedirects(
+                response, f'/recipes/{recipe_id}/',
+                fetch_redirect_response=False
+            )
+        short_link_resolver.flush()
+        self.assertEqual(
+            Recipe.objects.get(pk=recipe_id).short_link_clicks, 3
+        )
+
+    def test_unknown_and_oversized_codes(self):
+        client = APIClient()
+        for code in ('zz', 'z' * 20, encode(MAX_PK + 1)):
+            with self.subTest(code=code):
+                self.assertEqual(client.get(f'/s/{code}/').status_code, 404)
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+
+from api.tests.utils import FoodgramTestCase
+
+User = get_user_model()
+
+
+class SubscriptionsTests(FoodgramTestCase):
+
+    def add_author(self, number, recipes):
+        author = User.objects.create_user(
+            email=f'cook{number}@example.com', username=f'cook{number}',
+            first_name='Повар', last_name=str(number), password='pass-12345'
+        )
+        client = self.client_for(author)
+        recipe_ids = [
+            self.create_recipe(client, name=f'Рецепт {number}.{index}')
+            for index in range(recipes)
+        ]
+        response = self.request(
+            self.reader_client, 'post', f'/api/users/{author.pk}/subscribe/'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return author.pk, recipe_ids
+
+    def get(self, path, queries):
+        with self.assertNumQueries(queries):
+            response = self.reader_client.get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        return {
+            author['id']: author for author in response.data['results']
+        }
+
+    def test_recipes_limit_is_per_author(self):
+        authors = dict(
+            self.add_author(number, recipes)
+            for number, recipes in enumerate((3, 1, 0, 4))
+        )
+        # count, авторы, их последние рецепты и подписки читателя
+        results = self.get('/api/users/subscriptions/?recipes_limit=2', 4)
+        self.assertEqual(results.keys(), authors.keys())
+        for pk, recipe_ids in authors.items():
+            with self.subTest(author=pk):
+                self.assertEqual(
+                    [recipe['id'] for recipe in results[pk]['recipes']],
+                    recipe_ids[::-1][:2]
+                )
+                self.assertEqual(
+                    results[pk]['recipes_count'], len(recipe_ids)
+                )
+
+    def test_queries_do_not_grow_with_authors(self):
+        path = '/api/users/subscriptions/?recipes_limit=1'
+        for number in range(2):
+            self.add_author(number, 2)
+        self.assertEqual(len(self.get(path, 4)), 2)
+        for number in range(2, 6):
+            self.add_author(number, 2)
+        self.assertEqual(len(self.get(path, 4)), 6)
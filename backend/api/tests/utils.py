@@ -0,0 +1,93 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APIClient, APITestCase
+
+from api.models import Ingredient, Tag
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_data(color='red', size=(32, 32), mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class FoodgramTestCase(APITestCase):
+    """Пользователи, теги и ингредиенты; клиенты авторизованы токенами."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Рецептов', password='pass-12345'
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Рецептов', password='pass-12345'
+        )
+        cls.breakfast = Tag.objects.create(name='Завтрак', slug='breakfast')
+        cls.lunch = Tag.objects.create(name='Обед', slug='lunch')
+        cls.dinner = Tag.objects.create(name='Ужин', slug='dinner')
+        cls.beet, cls.cabbage, cls.potato, cls.egg = (
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (
+                ('свёкла', 'г'), ('капуста', 'г'), ('картофель', 'г'),
+                ('яйцо', 'шт')
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = self.client_for(self.author)
+        self.reader_client = self.client_for(self.reader)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def request(self, client, method, path, data=None):
+        """Запрос с выполнением колбэков on_commit, как после коммита."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(client, method)(path, data, format='json')
+
+    def recipe_data(self, name='Борщ', text='Суп со свёклой', tags=None,
+                    ingredients=None):
+        return {
+            'name': name,
+            'text': text,
+            'cooking_time': 60,
+            'image': image_data(),
+            'tags': [tag.pk for tag in tags or (self.lunch,)],
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': amount}
+                for ingredient, amount in (
+                    ingredients or ((self.beet, 200), (self.cabbage, 100))
+                )
+            ],
+        }
+
+    def create_recipe(self, client=None, **kwargs):
+        response = self.request(
+            client or self.author_client, 'post', '/api/recipes/',
+            self.recipe_data(**kwargs)
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.data['id']
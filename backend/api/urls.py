@@ -3,7 +3,7 @@ from rest_framework import routers
 from rest_framework.permissions import IsAuthenticated
 
 from .views import (IngredientViewSet, ProjectUserViewSet, RecipeViewSet,
-                    TagViewSet)
+                    TagViewSet, download_shopping_cart, metrics_view)
 
 router = routers.DefaultRouter()
 router.register('ingredients', IngredientViewSet, basename='ingredients')
@@ -21,5 +21,8 @@ users_urls = [
 urlpatterns = [
     path('auth/', include('djoser.urls.authtoken')),
     path('users/', include(users_urls)),
+    path('_metrics', metrics_view, name='metrics'),
+    path('recipes/download_shopping_cart/', download_shopping_cart,
+         name='recipes-download-shopping-cart'),
     path('', include(router.urls))
 ]
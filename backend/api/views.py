@@ -1,105 +1,108 @@
-import os
-from io import BytesIO
-
-from django.conf import settings
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Sum
-from django.http import FileResponse
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import (Http404, HttpResponse, HttpResponseNotAllowed,
+                         HttpResponseRedirect, JsonResponse)
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
-from rest_framework import status, viewsets
-from rest_framework.decorators import action
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework import exceptions, status, viewsets
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
-from .filters import NameSearchFilter, RecipeFilter
-from .models import (Cart, Favorite, Follow, Ingredient, IngredientRecipe,
-                     Recipe, Tag)
+from .cache import (INGREDIENTS_VERSION, RECIPES_VERSION, TAGS_VERSION,
+                    AnonymousCacheMixin, ConditionalGetMixin, recipe_version)
+from .filters import IngredientNameFilter, RecipeFilter
+from .images import delete_renditions
+from .metrics import metrics
+from .models import (Cart, Favorite, Follow, Ingredient, Recipe,
+                     ShoppingListItem, Tag)
+from .pagination import (CursorPaginationMixin, RecipeCursorPagination,
+                         SubscriptionCursorPagination)
+from .payloads import PreSerializedListMixin, ReferencePayload
+from .pdf import get_shopping_list_pdf
 from .permissions import AuthorOrAdminPermission
 from .serializers import (AvatarSerializer, CartSerializer, FavoriteSerializer,
                           FollowCreateSerializer, FollowSerializer,
-                          IngredientSerializer, RecipeSerializer,
-                          TagSerializer)
+                          IngredientSerializer, RecipeBatchSerializer,
+                          RecipeReadSerializer, RecipeSerializer,
+                          TagSerializer, get_recipes_limit)
+from .short_links import encode, short_link_resolver
+from .signals import carts_changed, favorites_changed
 
 User = get_user_model()
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    ConditionalGetMixin, PreSerializedListMixin, AnonymousCacheMixin,
+    viewsets.ReadOnlyModelViewSet
+):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (NameSearchFilter,)
     pagination_class = None
-    search_fields = ('^name',)
+    filter_backends = (IngredientNameFilter,)
+    cache_versions = (INGREDIENTS_VERSION,)
+    payload = ReferencePayload(
+        INGREDIENTS_VERSION, IngredientSerializer, Ingredient.objects.all()
+    )
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(
+    ConditionalGetMixin, PreSerializedListMixin, AnonymousCacheMixin,
+    viewsets.ReadOnlyModelViewSet
+):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    cache_versions = (TAGS_VERSION,)
+    payload = ReferencePayload(TAGS_VERSION, TagSerializer, Tag.objects.all())
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    ConditionalGetMixin, AnonymousCacheMixin, CursorPaginationMixin,
+    viewsets.ModelViewSet
+):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = (AuthorOrAdminPermission, IsAuthenticatedOrReadOnly)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    cursor_pagination_class = RecipeCursorPagination
+    cache_versions = (TAGS_VERSION, INGREDIENTS_VERSION)
+    user_dependent = True
+
+    def get_cache_versions(self):
+        versions = super().get_cache_versions()
+        if self.action == 'retrieve':
+            versions.append(recipe_version(self.kwargs['pk']))
+        else:
+            versions.append(RECIPES_VERSION)
+        return versions
+
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            return Recipe.objects.for_read(self.request.user)
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'retrieve'):
+            return RecipeReadSerializer
+        return super().get_serializer_class()
 
     @action(detail=True, url_path='get-link')
     def get_link(self, request, pk=None):
-        get_object_or_404(Recipe, pk=pk)
-        short_link = request.build_absolute_uri(f'/recipes/{pk}/')
-        return Response({'short-link': short_link}, status=status.HTTP_200_OK)
-
-    @action(
-        detail=False,
-        url_path='download_shopping_cart',
-        methods=['GET'],
-        permission_classes=[IsAuthenticated]
-    )
-    def download_shopping_cart(self, request):
-        font_path = os.path.join(settings.BASE_DIR, 'fonts', 'arial.ttf')
-        pdfmetrics.registerFont(TTFont('Arial', font_path))
-        buffer = BytesIO()
-        p = canvas.Canvas(buffer, pagesize=A4)
-        p.setFont('Arial', 14)
-        p.drawString(100, 780, 'Список покупок:')
-
-        cart = request.user.cart.select_related('recipe').all()
-        ingredients = IngredientRecipe.objects.filter(
-            recipe__in=[item.recipe for item in cart]
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(sum_amount=Sum('amount'))
-
-        y_position = 740
-        for ingr in ingredients:
-            text = (
-                f"- {ingr['ingredient__name']}: "
-                f"{ingr['sum_amount']} {ingr['ingredient__measurement_unit']}"
-            )
-            p.drawString(100, y_position, text)
-            y_position -= 20
-
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-        response = FileResponse(
-            buffer,
-            as_attachment=True,
-            filename='shopping_list.pdf',
-            content_type='application/pdf'
-        )
-        response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.pdf"'
+        if not pk.isdigit() or not short_link_resolver.exists(int(pk)):
+            raise Http404
+        short_link = request.build_absolute_uri(
+            reverse('short-link', args=(encode(int(pk)),))
         )
-        return response
+        return Response({'short-link': short_link}, status=status.HTTP_200_OK)
 
     def create_delete_relation(
             self, request, pk, model, model_serializer, message
@@ -130,6 +133,60 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    @transaction.atomic
+    def batch_relation(self, request, model, relations_changed, message):
+        """Добавляет или удаляет связь пользователя со списком рецептов
+        постоянным числом запросов: поиск, вставка или удаление."""
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        user = request.user
+
+        found = set(
+            Recipe.objects.filter(pk__in=recipe_ids).values_list(
+                'pk', flat=True
+            )
+        )
+        adding = request.method == 'POST'
+        # Создание и удаление идут без сигналов: учёт ведёт
+        # relations_changed только по действительно изменённым строкам
+        if adding:
+            changed = model.objects.create_missing(
+                user, [pk for pk in recipe_ids if pk in found]
+            )
+        else:
+            changed = model.objects.filter(
+                user=user, recipe_id__in=found
+            ).delete_rows()
+        if changed:
+            relations_changed(user.pk, changed, 1 if adding else -1)
+
+        changed = set(changed)
+        results = []
+        for pk in recipe_ids:
+            if pk not in found:
+                result = {
+                    'status': status.HTTP_404_NOT_FOUND,
+                    'detail': 'Рецепт не найден'
+                }
+            elif pk not in changed:
+                result = {
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'detail': (
+                        f'Рецепт уже в {message}' if adding
+                        else f'Рецепта не было в {message}'
+                    )
+                }
+            else:
+                result = {
+                    'status': (
+                        status.HTTP_201_CREATED if adding
+                        else status.HTTP_204_NO_CONTENT
+                    )
+                }
+            results.append({'id': pk, **result})
+        return Response(results, status=status.HTTP_200_OK)
+
     @action(
         detail=True,
         url_path='shopping_cart',
@@ -141,6 +198,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
             request, pk, Cart, CartSerializer, 'корзине'
         )
 
+    @action(
+        detail=False,
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+        methods=['POST', 'DELETE'],
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_batch(self, request):
+        return self.batch_relation(request, Cart, carts_changed, 'корзине')
+
     @action(
         detail=True,
         url_path='favorite',
@@ -152,10 +219,27 @@ class RecipeViewSet(viewsets.ModelViewSet):
             request, pk, Favorite, FavoriteSerializer, 'избранном'
         )
 
+    @action(
+        detail=False,
+        url_path='favorite',
+        url_name='favorite-batch',
+        methods=['POST', 'DELETE'],
+        permission_classes=[IsAuthenticated]
+    )
+    def favorite_batch(self, request):
+        return self.batch_relation(
+            request, Favorite, favorites_changed, 'избранном'
+        )
+
 
-class ProjectUserViewSet(UserViewSet):
+class ProjectUserViewSet(CursorPaginationMixin, UserViewSet):
     lookup_field = 'pk'
 
+    def get_cursor_pagination_class(self):
+        if self.action == 'subscriptions':
+            return SubscriptionCursorPagination
+        return None
+
     @action(
         detail=False,
         url_path='me/avatar',
@@ -177,7 +261,12 @@ class ProjectUserViewSet(UserViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         if user.avatar:
-            user.avatar.delete()
+            if not User.objects.filter(
+                avatar=user.avatar.name
+            ).exclude(pk=user.pk).exists():
+                delete_renditions(user.avatar)
+                user.avatar.delete(save=False)
+            user.avatar = None
             user.save()
             return Response(
                 {'message': 'Аватар успешно удалён'},
@@ -195,9 +284,15 @@ class ProjectUserViewSet(UserViewSet):
         permission_classes=[IsAuthenticated]
     )
     def subscriptions(self, request):
+        recipes = Recipe.objects.short()
+        recipes_limit = get_recipes_limit(request)
+        if recipes_limit is not None:
+            recipes = recipes.latest_per_author(recipes_limit)
         subscriptions = User.objects.filter(
             followers__user=request.user
-        ).prefetch_related('recipes').annotate(recipes_count=Count('recipes'))
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='latest_recipes')
+        )
         page = self.paginate_queryset(subscriptions)
         serializer = FollowSerializer(
             page, many=True, context={'request': request}
@@ -212,9 +307,7 @@ class ProjectUserViewSet(UserViewSet):
     )
     def subscribe(self, request, pk=None):
         user = request.user
-        following = get_object_or_404(
-            User.objects.annotate(recipes_count=Count('recipes')), pk=pk
-        )
+        following = get_object_or_404(User, pk=pk)
 
         if request.method == 'POST':
             serializer = FollowCreateSerializer(
@@ -239,3 +332,59 @@ class ProjectUserViewSet(UserViewSet):
             {'detail': 'Вы не были подписаны'},
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+def get_api_user(request):
+    """Аутентифицированный пользователь по настройкам DRF."""
+    user = Request(request, authenticators=[
+        authenticator()
+        for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ]).user
+    if not user.is_authenticated:
+        raise exceptions.NotAuthenticated
+    return user
+
+
+@api_view(('GET',))
+@permission_classes((IsAdminUser,))
+def metrics_view(request):
+    """Метрики запросов этого процесса в формате Prometheus."""
+    return HttpResponse(
+        metrics.render(), content_type='text/plain; version=0.0.4'
+    )
+
+
+def short_link_redirect(request, code):
+    """Перенаправляет с короткой ссылки на страницу рецепта."""
+    pk = short_link_resolver.resolve(code)
+    if pk is None:
+        raise Http404
+    return HttpResponseRedirect(f'/recipes/{pk}/')
+
+
+async def download_shopping_cart(request):
+    """Асинхронная выгрузка списка покупок пользователя в PDF."""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(('GET',))
+    try:
+        user = await sync_to_async(get_api_user)(request)
+    except exceptions.APIException as exc:
+        return JsonResponse(
+            {'detail': exc.detail}, status=exc.status_code,
+            json_dumps_params={'ensure_ascii': False}
+        )
+
+    lines = [
+        f'- {item.ingredient.name}: '
+        f'{item.amount} {item.ingredient.measurement_unit}'
+        async for item in ShoppingListItem.objects.filter(
+            user=user
+        ).select_related('ingredient').order_by('ingredient__name')
+    ]
+    response = HttpResponse(
+        await get_shopping_list_pdf(lines), content_type='application/pdf'
+    )
+    response['Content-Disposition'] = (
+        'attachment; filename="shopping_list.pdf"'
+    )
+    return response
@@ -0,0 +1,116 @@
+"""Бэкенд PostgreSQL, берущий соединения psycopg2 из пула.
+
+Каждый процесс держит по пулу на псевдоним базы. Django открывает
+соединение, забирая его из пула, и «закрывает», возвращая обратно,
+так что при CONN_MAX_AGE = 0 соединения переиспользуются между
+запросами и потоками. Это относится и к ASGI-серверу, где каждый
+запрос выполняется в своём потоке и постоянные соединения потока
+не переиспользуются.
+"""
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """ThreadedConnectionPool, который ждёт свободное соединение,
+    а не падает, когда заняты все."""
+
+    def __init__(self, min_size, max_size, timeout, health_checks,
+                 conn_params):
+        self.pool = ThreadedConnectionPool(min_size, max_size, **conn_params)
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.timeout = timeout
+        self.health_checks = health_checks
+
+    def getconn(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise base.Database.OperationalError(
+                'Нет свободных соединений в пуле базы данных'
+            )
+        try:
+            connection = self.pool.getconn()
+            if self.health_checks and not self.is_usable(connection):
+                self.pool.putconn(connection, close=True)
+                connection = self.pool.getconn()
+        except Exception:
+            self.slots.release()
+            raise
+        return connection
+
+    def putconn(self, connection):
+        status = connection.info.transaction_status
+        broken = (
+            bool(connection.closed)
+            or status == extensions.TRANSACTION_STATUS_UNKNOWN
+        )
+        try:
+            if not broken and status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except base.Database.Error:
+            broken = True
+        finally:
+            self.pool.putconn(connection, close=broken)
+            self.slots.release()
+
+    @staticmethod
+    def is_usable(connection):
+        if connection.closed:
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        if not connection.autocommit:
+            connection.rollback()
+        return True
+
+
+class PooledDatabase:
+    """Модуль psycopg2, connect() которого берёт соединения из пула."""
+
+    def __init__(self, get_pool):
+        self._get_pool = get_pool
+
+    def connect(self, **conn_params):
+        return self._get_pool(conn_params).getconn()
+
+    def __getattr__(self, name):
+        return getattr(base.Database, name)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if base.is_psycopg3:
+            raise ImproperlyConfigured(
+                'Для foodgram_backend.postgresql_pool нужен psycopg2'
+            )
+        self.Database = PooledDatabase(self.get_pool)
+
+    def get_pool(self, conn_params):
+        key = (self.alias, conn_params.get('dbname'))
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(
+                    self.settings_dict.get('POOL_MIN_SIZE', 1),
+                    self.settings_dict.get('POOL_MAX_SIZE', 10),
+                    self.settings_dict.get('POOL_TIMEOUT', 30),
+                    self.settings_dict['CONN_HEALTH_CHECKS'],
+                    conn_params
+                )
+        self.pool = pool
+        return pool
+
+    def _close(self):
+        if self.connection is not None:
+            self.pool.putconn(self.connection)
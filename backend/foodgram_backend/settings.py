@@ -51,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,19 +85,56 @@ WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# DB_POOL=True borrows connections from an in-process psycopg2 pool of
+# DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE per worker; keep CONN_MAX_AGE=0 with it.
+# Without the pool, CONN_MAX_AGE > 0 keeps a connection per thread open,
+# which pays off for sync (WSGI) workers only.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'foodgram_backend.postgresql_pool'
+            if os.getenv('DB_POOL', 'False') == 'True'
+            else 'django.db.backends.postgresql'
+        ),
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': (
+            os.getenv('CONN_HEALTH_CHECKS', 'True') == 'True'
+        ),
+        'POOL_MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+        'POOL_MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+        'POOL_TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+    }
+}
+
+# DB_SQLITE=True switches to a local SQLite file, e.g. to run the tests:
+# DB_SQLITE=True python manage.py test
+if os.getenv('DB_SQLITE', 'False') == 'True':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# LocMemCache is per process: data versions, including the token versions
+# behind the authentication cache, do not reach other workers. Run several
+# workers with a shared backend such as Redis.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
     }
-    # 'default': {
-    #     'ENGINE': 'django.db.backends.sqlite3',
-    #     'NAME': BASE_DIR / 'db.sqlite3',
-    # }
 }
 
 
@@ -144,6 +182,15 @@ STATIC_ROOT = '/backend_static/static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Maximum decoded size of a base64 image upload, bytes
+MAX_IMAGE_SIZE = int(os.getenv('MAX_IMAGE_SIZE', 10 * 1024 * 1024))
+
+# Requests slower than this are logged by api.metrics, milliseconds
+SLOW_REQUEST_THRESHOLD = int(os.getenv('SLOW_REQUEST_THRESHOLD', 500))
+
+# Workers in the pools for CPU-heavy work (PDF rendering, image decoding)
+CPU_POOL_SIZE = int(os.getenv('CPU_POOL_SIZE', os.cpu_count() or 1))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -154,7 +201,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPagination',
     'PAGE_SIZE': 6,
@@ -174,7 +221,8 @@ DJOSER = {
         'user_list': ['rest_framework.permissions.IsAuthenticatedOrReadOnly'],
         'user': ['api.permissions.AdminOrReadOnlyPermission']
     },
-    'HIDE_USERS': False
+    'HIDE_USERS': False,
+    'LOGOUT_ON_PASSWORD_CHANGE': True,
 }
 
 AUTHENTICATION_BACKENDS = [
@@ -1,8 +1,10 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from api.counters import DerivedFieldsMixin
 
-class ProjectUser(AbstractUser):
+
+class ProjectUser(DerivedFieldsMixin, AbstractUser):
     email = models.EmailField(unique=True, verbose_name='Почта')
     avatar = models.ImageField(
         upload_to='users/',
@@ -11,6 +13,23 @@ class ProjectUser(AbstractUser):
         blank=True,
         default=''
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписок'
+    )
+
+    derived_fields = ('recipes_count', 'followers_count', 'following_count')
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')